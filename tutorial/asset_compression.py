@@ -0,0 +1,229 @@
+# ASSET COMPRESSION — statik dosyaların önceden sıkıştırılmış (gzip / br / zstd) sürümleri
+# static.py, FastStaticFiles(precompressed=...) ile bu dosyayı kullanır.
+#
+# Neden?
+# GZipMiddleware her cevabı istek anında sıkıştırır: aynı app.js'i 10.000 kişi isterse
+# aynı byte'lar 10.000 kez sıkıştırılır ve her seferinde CPU harcanır.
+#
+# Burada:
+# - Dosya bir kez, en yüksek seviyede sıkıştırılır ve cache_dir'e yazılır (arka plan thread'inde)
+# - İstek geldiğinde Accept-Encoding'e göre en iyi hazır sürüm seçilir → istek başına sıkıştırma yok
+#   Gönderim yine FastStaticFiles üzerinden (sendfile/mmap, ETag, 304) yapılır
+# - Sıkıştırılabilir her dosyanın cevabına "Vary: Accept-Encoding" eklenir (ara cache'ler karıştırmasın)
+# - Her sürümün kendi ETag'i vardır ("abc" → "abc-br")
+# - Dosya değişirse (mtime / ETag farklı) eski sürüm kullanılmaz, yenisi arka planda üretilir;
+#   hazır olana kadar dosya sıkıştırılmadan gönderilir
+#
+# brotli ve zstd opsiyoneldir: pip install brotli zstandard (yoksa sadece gzip kullanılır)
+
+import gzip
+import hashlib
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    import brotli
+except ImportError:  # Opsiyonel paket
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # Opsiyonel paket
+    zstandard = None
+
+
+# 1) SIKIŞTIRICILAR
+# encoding adı → (sıkıştırma fonksiyonu, dosya uzantısı). Sıra = eşit tercihte hangisinin seçileceği.
+
+ENCODERS = {}
+if zstandard is not None:
+    ENCODERS["zstd"] = (lambda data: zstandard.ZstdCompressor(level=19).compress(data), ".zst")
+if brotli is not None:
+    ENCODERS["br"] = (lambda data: brotli.compress(data, quality=11), ".br")
+ENCODERS["gzip"] = (lambda data: gzip.compress(data, compresslevel=9, mtime=0), ".gz")
+
+# Zaten sıkıştırılmış türler (png, jpeg, zip, woff2 ...) burada yok: tekrar sıkıştırmak boşuna CPU
+COMPRESSIBLE_TYPES = {
+    "application/javascript",
+    "application/json",
+    "application/manifest+json",
+    "application/wasm",
+    "application/xml",
+    "image/svg+xml",
+    "text/javascript",
+}
+
+
+def parse_accept_encoding(header: str) -> dict[str, float]:
+    """ "br;q=1.0, gzip;q=0.8, *;q=0" → {"br": 1.0, "gzip": 0.8, "*": 0.0} """
+    weights = {}
+    for part in header.split(","):
+        name, _, params = part.strip().partition(";")
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                continue
+        if name:
+            weights[name.strip().lower()] = q
+    return weights
+
+
+# 2) ÖNBELLEK
+
+class PrecompressedCache:
+    """
+    cache_dir → sıkıştırılmış dosyaların yazılacağı klasör (statik klasörün DIŞINDA olmalı)
+    min_size / max_size → bu aralık dışındaki dosyalar sıkıştırılmaz
+    min_saving → sıkıştırılmış hal en az bu oranda küçük değilse saklanmaz
+    """
+
+    def __init__(
+        self,
+        cache_dir: str,
+        *,
+        encodings: tuple[str, ...] | None = None,
+        min_size: int = 256,
+        max_size: int = 32 * 1024 * 1024,
+        min_saving: float = 0.1,
+    ):
+        self.cache_dir = cache_dir
+        self.encodings = tuple(name for name in (encodings or ENCODERS) if name in ENCODERS)
+        self.min_size = min_size
+        self.max_size = max_size
+        self.min_saving = min_saving
+        # kaynak yol → (sürüm, {encoding: (sıkıştırılmış dosya yolu, boyut)})
+        self._variants: dict[str, tuple[tuple, dict[str, tuple[str, int]]]] = {}
+        self._pending: set[str] = set()
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="precompress")
+
+        # İstatistikler
+        self.built = 0
+        self.served: dict[str, int] = {}
+        self.not_ready = 0
+
+    def compressible(self, entry) -> bool:
+        content_type = entry.content_type
+        return (
+            (content_type.startswith("text/") or content_type in COMPRESSIBLE_TYPES)
+            and self.min_size <= entry.size <= self.max_size
+        )
+
+    # 3) İSTEK ANINDA SEÇİM (event loop'ta, I/O yok)
+
+    def select(self, entry, scope):
+        """Uygun sıkıştırılmış sürümü döner; yoksa / istenmiyorsa orijinali (Vary eklenmiş olarak)."""
+        if not self.compressible(entry):
+            return entry
+        vary = [(b"vary", b"Accept-Encoding")]
+        version = (entry.mtime, entry.etag)
+        cached = self._variants.get(entry.path)
+        if cached is None or cached[0] != version:
+            self.schedule(entry)  # İlk istek veya dosya değişti → arka planda üret
+            self.not_ready += 1
+            return entry.variant(entry.path, entry.size, entry.etag, vary)
+
+        request_headers = dict(scope["headers"])
+        accept = request_headers.get(b"accept-encoding")
+        # Range isteklerinde orijinal gönderilir: aralıklar sıkıştırılmamış byte'lara göre istenir
+        if accept is None or b"range" in request_headers:
+            return entry.variant(entry.path, entry.size, entry.etag, vary)
+
+        weights = parse_accept_encoding(accept.decode("latin-1"))
+        default = weights.get("*", 0.0)
+        best, best_q = None, 0.0
+        for encoding in self.encodings:  # Sıra tercih sırası → eşitlikte öndeki kazanır
+            q = weights.get(encoding, default)
+            if encoding in cached[1] and q > best_q:
+                best, best_q = encoding, q
+        if best is None:
+            return entry.variant(entry.path, entry.size, entry.etag, vary)
+
+        path, size = cached[1][best]
+        self.served[best] = self.served.get(best, 0) + 1
+        etag = entry.etag[:-1] + f'-{best}"'
+        return entry.variant(path, size, etag, [*vary, (b"content-encoding", best.encode())])
+
+    # 4) ARKA PLANDA ÜRETME
+
+    def schedule(self, entry):
+        with self._lock:
+            if entry.path in self._pending:
+                return
+            self._pending.add(entry.path)
+        self._executor.submit(self._build, entry.path, (entry.mtime, entry.etag))
+
+    def warm(self, static_files):
+        """
+        Klasördeki tüm sıkıştırılabilir dosyaları sıraya koyar (uygulama açılışında çağrılır).
+        static_files → FastStaticFiles; load_entry ile ETag'ler de önceden hesaplanmış olur.
+        """
+
+        def walk():
+            for root, _, names in os.walk(static_files.directory):
+                for name in names:
+                    entry = static_files.load_entry(os.path.join(root, name))
+                    if entry is not None and self.compressible(entry):
+                        self.schedule(entry)
+
+        self._executor.submit(walk)
+
+    def _build(self, source_path: str, version: tuple):
+        try:
+            with open(source_path, "rb") as f:
+                data = f.read()
+            os.makedirs(self.cache_dir, exist_ok=True)
+            prefix = hashlib.sha1(source_path.encode()).hexdigest()[:16]
+            tag = hashlib.sha1(repr(version).encode()).hexdigest()[:12]
+            variants = {}
+            for encoding in self.encodings:
+                compress, suffix = ENCODERS[encoding]
+                compressed = compress(data)
+                if len(compressed) > len(data) * (1 - self.min_saving):
+                    continue  # Değmez
+                target = os.path.join(self.cache_dir, f"{prefix}-{tag}{suffix}")
+                tmp_path = target + ".tmp"
+                with open(tmp_path, "wb") as f:
+                    f.write(compressed)
+                os.replace(tmp_path, target)
+                variants[encoding] = (target, len(compressed))
+
+            old = self._variants.get(source_path)
+            self._variants[source_path] = (version, variants)
+            self.built += 1
+            if old is not None:  # Dosyanın eski sürümüne ait sıkıştırılmış dosyaları sil
+                for path, _ in old[1].values():
+                    if path not in {p for p, _ in variants.values()}:
+                        try:
+                            os.remove(path)
+                        except FileNotFoundError:
+                            pass
+        except (FileNotFoundError, PermissionError):
+            self._variants.pop(source_path, None)
+        finally:
+            with self._lock:
+                self._pending.discard(source_path)
+
+    def wait(self):
+        """Sıradaki tüm işler bitene kadar bekler (testler ve benchmark için)."""
+        while True:
+            self._executor.submit(lambda: None).result()  # Tek worker → önceki işler bitmiş olur
+            if not self._pending:  # warm() yeni iş eklemiş olabilir, tekrar bak
+                return
+
+    def stats(self) -> dict:
+        return {
+            "files": len(self._variants),
+            "built": self.built,
+            "pending": len(self._pending),
+            "served": dict(self.served),
+            "not_ready": self.not_ready,
+            "encodings": list(self.encodings),
+        }
+
+    def close(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
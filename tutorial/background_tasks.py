@@ -4,41 +4,112 @@ Arkaplan görevleri, API cevabı döndükten sonra çalışmaya devam eden fonks
 Kullanıcı beklememiş olur, performans artar.
 """
 
-from fastapi import FastAPI, BackgroundTasks
+import os
+from fastapi import FastAPI
+
+from log_sink import LogSink  # Aynı klasördeki log yazıcısı
+from task_queue import TaskQueue  # Aynı klasördeki kuyruk katmanı
 
 app = FastAPI()
 
+LOG_FILE = "log.txt"
+
 # -----------------------------------------------------------
 # ARKA PLANDA ÇALIŞACAK GÖREV
 # -----------------------------------------------------------
 
-def save_log_to_file(message: str):
+def save_log_to_file(message: str, path: str = LOG_FILE):
     """
     Bu fonksiyon arka planda çalışır.
     Çok basit bir işlem yapıyor: bir log dosyasına veri yazıyor.
     Normalde dosya yazmak yavaş olabilir, bu yüzden arka plana almak mantıklı.
     """
-    with open("log.txt", "a") as f:
+    with open(path, "a") as f:
         f.write(message + "\n")
 #with: Dosyayı güvenli şekilde açmak, İş bittiğinde otomatik olarak kapatmak, Hata olsa bile dosyayı kapatmak
 
+
+def save_logs_to_file(messages: list[str], path: str = LOG_FILE):
+    """
+    Toplu versiyon: bir grup mesaj için dosya bir kez açılır, tek writelines ile yazılır.
+    Kuyruk worker'ları bunu thread havuzunda çağırır.
+    """
+    with open(path, "a") as f:
+        f.writelines(message + "\n" for message in messages)
+
+
+# -----------------------------------------------------------
+# LOG SINK (bloklamayan yazıcı)
+# -----------------------------------------------------------
+# save_log_to_file / save_logs_to_file dosyayı çağıran thread'de açıp yazar.
+# log_sink ise satırları bellekte biriktirir, ayrı bir thread tek writelines ile yazar (bkz. log_sink.py).
+# LOG_FSYNC: none / interval / always, LOG_MAX_BYTES aşılınca log.txt.1, log.txt.2 ... diye döndürülür.
+
+log_sink = LogSink(
+    LOG_FILE,
+    fsync=os.getenv("LOG_FSYNC", "interval"),
+    max_bytes=int(os.getenv("LOG_MAX_BYTES", str(10 * 1024 * 1024))),
+    backup_count=int(os.getenv("LOG_BACKUP_COUNT", "5")),
+)
+
+
+def save_logs_to_sink(messages: list[str]):
+    """
+    Kuyruk handler'ı: mesajları sink'e verir ve yazılana kadar bekler.
+    Böylece journal'a "done" ancak satırlar dosyaya ulaştıktan sonra yazılır.
+    Aynı anda bekleyen worker'ların satırları writer thread'de tek gruba düşer (group commit).
+    Tampon dolduysa veya yazma hata verdiyse hata yükseltilir → kuyruk batch'i backoff ile tekrar dener.
+    write_batch ya hepsini yazar ya hiçbirini; tekrar denemede satırlar iki kez yazılmaz.
+    """
+    if not log_sink.write_batch(messages):
+        raise RuntimeError(f"Log tamponu dolu: {len(messages)} satır kabul edilmedi")
+
+
+# -----------------------------------------------------------
+# KALICI, TOPLU GÖREV KUYRUĞU
+# -----------------------------------------------------------
+# BackgroundTasks işi isteğin içinde, tek tek çalıştırır; süreç çökerse iş kaybolur.
+# log_queue ise mesajları biriktirip log_sink'e toplu verir (bkz. task_queue.py).
+# TASK_QUEUE_JOURNAL verilirse mesajlar işlenmeden önce bu dosyaya yazılır → çökme sonrası kaybolmaz.
+# Journal kayıtları put() başına değil, en geç flush_interval içinde toplu ve event loop dışında yazılır
+# (bu pencerede çökme olursa son kabul edilen mesajlar kaybolabilir).
+
+log_queue = TaskQueue(
+    save_logs_to_sink,
+    workers=int(os.getenv("TASK_QUEUE_WORKERS", "2")),
+    batch_size=int(os.getenv("TASK_QUEUE_BATCH_SIZE", "500")),
+    flush_interval=float(os.getenv("TASK_QUEUE_FLUSH_MS", "50")) / 1000,
+    journal_path=os.getenv("TASK_QUEUE_JOURNAL") or None,
+)
+
+
+@app.on_event("startup")
+async def start_log_queue():
+    log_sink.start()
+    await log_queue.start()
+
+
+@app.on_event("shutdown")
+async def stop_log_queue():
+    # Kapanırken kuyrukta bekleyen tüm loglar yazılır (graceful drain), sonra sink kapanır
+    await log_queue.stop()
+    log_sink.close()
+
 # -----------------------------------------------------------
 # NORMAL ENDPOINT (arka plan görevi kullanan)
 # -----------------------------------------------------------
 
 #BackgroundTasks: API cevabı döndükten sonra arka planda işlem yapmanı sağlar.
+#Eski hali: background_tasks.add_task(save_log_to_file, ...) → her istek için ayrı open/append/close
 @app.post("/process/{username}")
-async def process_user(username: str, background_tasks: BackgroundTasks):
+async def process_user(username: str):
     """
     Bu endpoint bir kullanıcıyı işlemden geçiriyor (sözde).
     Kullanıcıya hemen cevap döneriz fakat arka planda log tutmaya devam ederiz.
     """
 
-    
-    background_tasks.add_task( # add_task -> Arkaplan görevine bir işi ekliyoruz
-        save_log_to_file,
-        f"User {username} was processed."
-    )
+    # put → mesaj kuyruğa girer, yazma işi worker'larda toplu yapılır
+    await log_queue.put(f"User {username} was processed.")
 
     # Client hızlı bir cevap alır
     return {"status": "processing started", "user": username}
@@ -48,26 +119,80 @@ async def process_user(username: str, background_tasks: BackgroundTasks):
 # DEPENDENCY İÇİNDE ARKA PLAN GÖREVİ
 # -----------------------------------------------------------
 
-def log_query(background_tasks: BackgroundTasks, q: str | None = None):
+async def log_query(q: str | None = None):
     """
     Bu fonksiyon dependency olarak kullanılır.
     Eğer ?q=something gelirse, bu bilgiyi log dosyasına arka planda yazar.
     """
 
     if q:
-        background_tasks.add_task(save_log_to_file, f"Query param detected: {q}")
+        await log_queue.put(f"Query param detected: {q}")
 
     return q
 
 
 @app.get("/search")
-async def search_items(q: str | None = None, background_tasks: BackgroundTasks = None):
+async def search_items(q: str | None = None):
     """
     Hem kullanıcıya sonuç döneriz hem de gelen query bilgisini arka planda kaydederiz.
     """
 
     # Eğer query varsa log yaz
     if q:
-        background_tasks.add_task(save_log_to_file, f"Search query: {q}")
+        await log_queue.put(f"Search query: {q}")
 
     return {"results": ["item1", "item2"], "query": q}
+
+
+@app.get("/tasks/stats")
+async def task_stats():
+    return {"queue": log_queue.stats(), "log_sink": log_sink.stats()}
+
+
+# -----------------------------------------------------------
+# BENCHMARK
+# -----------------------------------------------------------
+# Sadece "python background_tasks.py" ile çalıştırıldığında devreye girer.
+
+def benchmark_log_paths(messages: int = 20_000):
+    """
+    Aynı sayıda log satırını iki yoldan yazar:
+    - eski yol: her mesaj için save_log_to_file (BackgroundTasks'ın yaptığı gibi, sırayla)
+    - kuyruk: log_queue.put + stop() ile tümü yazılana kadar bekleme
+    """
+    import asyncio
+    import tempfile
+    import time
+    from functools import partial
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "old.txt")
+        start = time.perf_counter()
+        for i in range(messages):
+            save_log_to_file(f"User {i} was processed.", path)
+        old_elapsed = time.perf_counter() - start
+
+        for journal in (None, os.path.join(tmp, "queue.journal")):
+            path = os.path.join(tmp, "queue.txt")
+            queue = TaskQueue(partial(save_logs_to_file, path=path), batch_size=500, journal_path=journal)
+
+            async def run():
+                await queue.start()
+                for i in range(messages):
+                    await queue.put(f"User {i} was processed.")
+                await queue.stop()
+
+            start = time.perf_counter()
+            asyncio.run(run())
+            queue_elapsed = time.perf_counter() - start
+            with open(path) as f:
+                assert sum(1 for _ in f) == messages
+            os.remove(path)
+            label = "kuyruk + journal" if journal else "kuyruk"
+            print(f"{label:17s}: {messages / queue_elapsed:9.0f} satır/sn  ({queue.batches} batch)")
+
+        print(f"{'eski (open/close)':17s}: {messages / old_elapsed:9.0f} satır/sn")
+
+
+if __name__ == "__main__":
+    benchmark_log_paths()
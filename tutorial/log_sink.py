@@ -0,0 +1,298 @@
+# LOG SINK — bloklamayan, grup halinde yazan log dosyası yazıcısı
+# background_tasks.py bu dosyayı kullanır.
+#
+# Neden?
+# save_log_to_file her satır için open("log.txt", "a") + write + close yapar.
+# Bu çağrı async endpoint'lerden sonra event loop thread'inde çalışır → disk yavaşsa tüm istekler bekler.
+#
+# Burada:
+# - write(line) satırı sadece bellekteki tampona ekler (kilit al, listeye ekle, bırak) → bloklamaz
+# - Ayrı bir writer thread tamponu bir seferde devralır ve tek writelines ile yazar (group commit)
+#   Writer yazarken gelen satırlar bir sonraki gruba birikir → yük arttıkça grup büyür, syscall sayısı artmaz
+# - fsync politikası:
+#     none     → fsync yok, veri işletim sisteminin cache'inde (en hızlı, elektrik kesintisinde kayıp olabilir)
+#     interval → en fazla fsync_interval saniyede bir fsync
+#     always   → her gruptan sonra fsync (flush() dönünce satır diskte)
+# - Dosya max_bytes'ı geçince döndürülür (rotation): log.txt → log.txt.1 → log.txt.2 ...
+# - Yazma / fsync / döndürme hata verirse (disk dolu, izin ...) writer thread ölmez:
+#   hata kaydedilir, bekleyenler uyandırılır ve flush() hatayı yükseltir → çağıran tekrar deneyebilir
+
+import os
+import threading
+import time
+from collections import deque
+
+
+FSYNC_POLICIES = ("none", "interval", "always")
+
+
+class LogSink:
+    """
+    path → yazılacak dosya
+    max_buffer → tamponda bekleyebilecek en fazla satır; dolarsa yeni satırlar atılır (dropped sayılır)
+    max_bytes → dosya bu boyutu geçince döndürülür (0 → döndürme yok)
+    backup_count → kaç eski dosya saklanacağı
+    """
+
+    def __init__(
+        self,
+        path: str,
+        *,
+        fsync: str = "interval",
+        fsync_interval: float = 1.0,
+        max_buffer: int = 100_000,
+        max_bytes: int = 10 * 1024 * 1024,
+        backup_count: int = 5,
+    ):
+        if fsync not in FSYNC_POLICIES:
+            raise ValueError(f"fsync şunlardan biri olmalı: {FSYNC_POLICIES}")
+        self.path = path
+        self.fsync = fsync
+        self.fsync_interval = fsync_interval
+        self.max_buffer = max_buffer
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+
+        self._buffer: list[str] = []
+        self._cond = threading.Condition()
+        self._accepted = 0  # write() ile kabul edilen satır sayısı
+        self._written = 0  # Dosyaya yazılmış (ve politikaya göre fsync edilmiş) satır sayısı
+        self._done = 0  # Writer'ın ele aldığı satır sayısı (yazılan + hata yüzünden kaybolan)
+        # Yazılamayan grupların satır aralıkları [başlangıç, bitiş) (_done cinsinden, son 1024 grup)
+        self._failures: deque[tuple[int, int]] = deque(maxlen=1024)
+        self._last_error: Exception | None = None
+        self._closing = False
+        self._thread: threading.Thread | None = None
+        self._file = None
+        self._last_fsync = time.monotonic()
+
+        # İstatistikler
+        self.groups = 0
+        self.bytes_written = 0
+        self.fsyncs = 0
+        self.rotations = 0
+        self.dropped = 0
+        self.errors = 0
+        self.failed_lines = 0
+
+    # 1) BAŞLATMA / KAPATMA
+
+    def start(self):
+        self._file = open(self.path, "a", encoding="utf-8")
+        self._thread = threading.Thread(target=self._run, name="log-sink", daemon=True)
+        self._thread.start()
+
+    def close(self):
+        """Tampondaki her şeyi yazar, fsync eder ve thread'i durdurur."""
+        with self._cond:
+            self._closing = True
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    # 2) YAZMA (herhangi bir thread'den veya event loop'tan)
+
+    def write(self, line: str) -> bool:
+        """Satırı tampona ekler. Tampon doluysa False döner (satır atılır)."""
+        with self._cond:
+            if len(self._buffer) >= self.max_buffer:
+                self.dropped += 1
+                return False
+            self._buffer.append(line + "\n")
+            self._accepted += 1
+            self._cond.notify()
+        return True
+
+    def write_many(self, lines: list[str]) -> int:
+        """
+        Birden fazla satırı tek kilitle ekler; ya hepsi ya hiçbiri (tampona sığmazsa 0 döner).
+        Satırlar tek seferde eklendiği için writer'da hep aynı gruba düşer. Kabul edilen satır sayısını döner.
+        """
+        with self._cond:
+            return self._append(lines)
+
+    def write_batch(self, lines: list[str], timeout: float | None = None) -> bool:
+        """
+        write_many + sadece BU satırların yazılmasını bekler (event loop'tan çağırmayın).
+        Tampon doluysa hiçbir satır eklenmez ve False döner; satırların grubu yazılamadıysa hata yükseltir.
+        Yani hata durumunda satırların hiçbiri yazılmamıştır → çağıran tüm listeyi tekrar gönderebilir.
+        """
+        with self._cond:
+            start = self._accepted
+            if lines and not self._append(lines):
+                return False
+            end = self._accepted
+            if not self._cond.wait_for(lambda: self._done >= end, timeout):
+                raise TimeoutError("Log satırları zamanında yazılamadı")
+            self._raise_if_failed(start, end)
+            return True
+
+    def _append(self, lines: list[str]) -> int:
+        if len(self._buffer) + len(lines) > self.max_buffer:
+            self.dropped += len(lines)
+            return 0
+        self._buffer.extend(line + "\n" for line in lines)
+        self._accepted += len(lines)
+        self._cond.notify()
+        return len(lines)
+
+    def _raise_if_failed(self, start: int, end: int):
+        """[start, end) aralığındaki satırlardan biri hatalı bir gruptaysa writer'ın hatasını yükseltir."""
+        if any(f_start < end and start < f_end for f_start, f_end in self._failures):
+            raise OSError(f"Log satırları yazılamadı: {self._last_error}") from self._last_error
+
+    def flush(self, timeout: float | None = None) -> bool:
+        """
+        Bu çağrıya kadar kabul edilen satırlar yazılana kadar bekler (event loop'tan çağırmayın).
+        fsync="always" ise dönünce satırlar diskte demektir.
+        Zaman aşımında False döner; beklenen satırlardan biri yazılamadıysa writer'ın hatasını yükseltir.
+        """
+        with self._cond:
+            start, target = self._done, self._accepted
+            if not self._cond.wait_for(lambda: self._done >= target, timeout):
+                return False
+            self._raise_if_failed(start, target)
+            return True
+
+    def stats(self) -> dict:
+        return {
+            "buffered": len(self._buffer),
+            "lines_written": self._written,
+            "groups": self.groups,
+            "bytes_written": self.bytes_written,
+            "fsyncs": self.fsyncs,
+            "rotations": self.rotations,
+            "dropped": self.dropped,
+            "errors": self.errors,
+            "failed_lines": self.failed_lines,
+            "last_error": repr(self._last_error) if self._last_error else None,
+        }
+
+    # 3) WRITER THREAD
+
+    def _run(self):
+        while True:
+            with self._cond:
+                # Interval politikasında boşta da olsa zamanı gelince fsync yapılabilsin diye timeout'lu bekle
+                timeout = self.fsync_interval if self.fsync == "interval" else None
+                self._cond.wait_for(lambda: self._buffer or self._closing, timeout)
+                group, self._buffer = self._buffer, []  # Tüm tamponu tek seferde devral
+                closing = self._closing
+
+            error = None
+            try:
+                if group:
+                    self._file.writelines(group)  # Grup başına tek yazma
+                    self._file.flush()
+                    self.groups += 1
+                    self.bytes_written += sum(len(line) for line in group)
+                self._maybe_fsync(force=closing)
+                if group and self.max_bytes and self._file.tell() >= self.max_bytes:
+                    self._rotate()
+            except (OSError, ValueError) as exc:  # ValueError → önceki hatada kapalı kalmış dosya
+                error = exc
+                self._reopen()
+
+            with self._cond:
+                group_start = self._done
+                self._done += len(group)
+                if error is None:
+                    self._written += len(group)
+                else:
+                    self.errors += 1
+                    self.failed_lines += len(group)
+                    self._failures.append((group_start, self._done))
+                    self._last_error = error
+                self._cond.notify_all()  # flush() bekleyenleri uyandır
+                if closing and not self._buffer:
+                    try:
+                        self._file.close()
+                    except OSError:
+                        pass
+                    return
+
+    def _maybe_fsync(self, force: bool = False):
+        if self.fsync == "none" and not force:
+            return
+        now = time.monotonic()
+        if force or self.fsync == "always" or now - self._last_fsync >= self.fsync_interval:
+            os.fsync(self._file.fileno())
+            self._last_fsync = now
+            self.fsyncs += 1
+
+    def _rotate(self):
+        """log.txt.(n-1) → log.txt.n, ..., log.txt → log.txt.1 (RotatingFileHandler ile aynı düzen)."""
+        self._file.close()
+        if self.backup_count > 0:
+            for i in range(self.backup_count - 1, 0, -1):
+                source = f"{self.path}.{i}"
+                if os.path.exists(source):
+                    os.replace(source, f"{self.path}.{i + 1}")
+            os.replace(self.path, f"{self.path}.1")
+        else:
+            os.remove(self.path)
+        self._file = open(self.path, "a", encoding="utf-8")
+        self.rotations += 1
+
+    def _reopen(self):
+        """Hatadan sonra dosyayı yeniden açmayı dener; olmazsa bir sonraki grup tekrar dener."""
+        try:
+            self._file.close()
+        except OSError:
+            pass
+        try:
+            self._file = open(self.path, "a", encoding="utf-8")
+        except OSError:
+            pass
+
+
+# 4) BENCHMARK
+# "python log_sink.py" → her fsync politikası için:
+# - saniyede 10k satır sabit yük altında write() çağrısının süresi ve grup sayısı
+# - sınırsız yük altında en yüksek satır/sn
+
+def benchmark_log_sink(rate: int = 10_000, seconds: float = 2.0, burst: int = 200_000):
+    import tempfile
+
+    line = "User 12345 was processed. " + "x" * 40
+    print(f"{'politika':9s} {'10k/sn: p99 write':>18s} {'grup':>6s} {'fsync':>6s} {'max satır/sn':>13s}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for policy in FSYNC_POLICIES:
+            sink = LogSink(
+                os.path.join(tmp, f"{policy}.log"),
+                fsync=policy, fsync_interval=0.2, max_bytes=0, max_buffer=burst,
+            )
+            sink.start()
+
+            # Sabit hız: her 1 ms'de rate/1000 satır
+            latencies = []
+            per_tick = rate // 1000
+            start = time.perf_counter()
+            for tick in range(int(seconds * 1000)):
+                for _ in range(per_tick):
+                    t0 = time.perf_counter()
+                    sink.write(line)
+                    latencies.append(time.perf_counter() - t0)
+                sleep_for = start + (tick + 1) / 1000 - time.perf_counter()
+                if sleep_for > 0:
+                    time.sleep(sleep_for)
+            sink.flush()
+            latencies.sort()
+            p99_us = latencies[int(len(latencies) * 0.99)] * 1_000_000
+            groups, fsyncs = sink.groups, sink.fsyncs
+
+            # Sınırsız: olabildiğince hızlı yaz, hepsi yazılana kadar bekle
+            start = time.perf_counter()
+            for _ in range(burst):
+                sink.write(line)
+            sink.flush()
+            burst_rate = burst / (time.perf_counter() - start)
+            sink.close()
+            assert sink.dropped == 0
+
+            print(f"{policy:9s} {p99_us:15.1f} µs {groups:6d} {fsyncs:6d} {burst_rate:13.0f}")
+
+
+if __name__ == "__main__":
+    benchmark_log_sink()
@@ -1,13 +1,95 @@
 # FastAPI'de middleware kullanımını gösteren tam açıklamalı örnek
 #Middleware bir istek geldiğinde: Endpoint çalışmadan ÖNCE devreye girer, Endpoint çalıştıktan SONRA tekrar devreye girer
+import os
 import time
+from bisect import bisect_left
 from fastapi import FastAPI, Request
+from fastapi.responses import PlainTextResponse, StreamingResponse
 
 app = FastAPI()
 
+
+# 0) METRİK KAYITLARI
+# Middleware her isteğin süresini zaten ölçüyor; bu süreyi header'a yazıp atmak yerine
+# route / method / status bazında histogramlarda biriktiriyoruz.
+# /metrics endpoint'i bunları Prometheus'un okuyabildiği metin formatında döner.
+#
+# Kilit (lock) yok: tüm güncellemeler event loop thread'inde, arada await olmadan yapılır.
+# Yani iki istek aynı sayacı aynı anda değiştiremez.
+
+# Sabit histogram sınırları (saniye). Son kova (+Inf) bunlardan büyük her şeyi sayar.
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class LatencyHistogram:
+    __slots__ = ("counts", "total", "count")
+
+    def __init__(self):
+        self.counts = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, seconds: float):
+        self.counts[bisect_left(LATENCY_BUCKETS, seconds)] += 1
+        self.total += seconds
+        self.count += 1
+
+
+class RequestMetrics:
+    def __init__(self):
+        self.histograms: dict[tuple[str, str, int], LatencyHistogram] = {}
+        self.in_flight: dict[str, int] = {}  # method → şu an işlenen istek sayısı
+
+    def request_started(self, method: str):
+        self.in_flight[method] = self.in_flight.get(method, 0) + 1
+
+    def request_finished(self, method: str, route: str, status_code: int, seconds: float):
+        self.in_flight[method] -= 1
+        key = (route, method, status_code)
+        histogram = self.histograms.get(key)
+        if histogram is None:
+            histogram = self.histograms[key] = LatencyHistogram()
+        histogram.observe(seconds)
+
+    def render(self) -> str:
+        """Prometheus text exposition formatı."""
+        lines = [
+            "# HELP http_request_duration_seconds HTTP istek süresi",
+            "# TYPE http_request_duration_seconds histogram",
+        ]
+        for (route, method, status_code), histogram in sorted(self.histograms.items()):
+            labels = f'route="{route}",method="{method}",status="{status_code}"'
+            cumulative = 0
+            for bound, count in zip(LATENCY_BUCKETS, histogram.counts):
+                cumulative += count
+                lines.append(f'http_request_duration_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+            lines.append(f'http_request_duration_seconds_bucket{{{labels},le="+Inf"}} {histogram.count}')
+            lines.append(f"http_request_duration_seconds_sum{{{labels}}} {histogram.total}")
+            lines.append(f"http_request_duration_seconds_count{{{labels}}} {histogram.count}")
+        lines += [
+            "# HELP http_requests_in_flight Şu an işlenen istek sayısı",
+            "# TYPE http_requests_in_flight gauge",
+        ]
+        for method, value in sorted(self.in_flight.items()):
+            lines.append(f'http_requests_in_flight{{method="{method}"}} {value}')
+        return "\n".join(lines) + "\n"
+
+
+metrics = RequestMetrics()
+
+
+def route_label(scope: dict) -> str:
+    """
+    Label olarak gerçek path (/items/42) değil route şablonu (/items/{item_id}) kullanılır.
+    Aksi halde her farklı id yeni bir zaman serisi açar.
+    Router eşleşen route'u scope["route"] içine yazar, bu yüzden istek işlendikten SONRA okunur.
+    """
+    route = scope.get("route")
+    return route.path if route is not None else "<unmatched>"
+
 # 1) Middleware oluşturma
-# Her HTTP isteğinde otomatik olarak çalışır
-@app.middleware("http")
+# Klasik yol: @app.middleware("http") ile yazılan fonksiyon.
+# Aşağıda app'e doğrudan dekoratörle değil, MIDDLEWARE_MODE'a göre eklenir (bkz. 1c).
 async def add_process_time_header(request: Request, call_next): #call_next → İsteği asıl endpoint’e ileten fonksiyon
     """
     Bu middleware:
@@ -21,12 +103,21 @@ async def add_process_time_header(request: Request, call_next): #call_next → 
 
     # İsteğin başlangıç zamanını al
     start_time = time.perf_counter()
+    metrics.request_started(request.method)
 
     # İstek route'a iletiliyor
-    response = await call_next(request)
+    try:
+        response = await call_next(request)
+    except Exception:
+        # Endpoint hata fırlattıysa 500 olarak kaydet, hatayı yukarı ilet
+        metrics.request_finished(
+            request.method, route_label(request.scope), 500, time.perf_counter() - start_time
+        )
+        raise
 
     # Toplam geçen süre
     process_time = time.perf_counter() - start_time
+    metrics.request_finished(request.method, route_label(request.scope), response.status_code, process_time)
 
     # Response header'a süre bilgisini ekle
     response.headers["X-Process-Time"] = str(process_time)
@@ -35,6 +126,68 @@ async def add_process_time_header(request: Request, call_next): #call_next → 
     return response
 
 
+# 1b) Saf ASGI middleware
+# @app.middleware("http") arka planda BaseHTTPMiddleware kullanır. Bu her istekte:
+# - endpoint'i ayrı bir task'ta çalıştırır
+# - cevabı bellek içi stream'ler (memory stream) üzerinden geri taşır
+# - büyük/streaming cevaplarda backpressure'ı bozar (istemci yavaşsa bile üretici durmaz)
+#
+# Saf ASGI middleware ise sadece (scope, receive, send) üçlüsünü alır ve send'i sarar:
+# - "http.response.start" mesajı geçerken süreyi ölçüp header'ı ekler
+# - body parçalarına hiç dokunmaz → ek task, kopya veya tampon yok
+# Header'daki süre "ilk byte'a kadar" geçen süredir (call_next'teki ile aynı an).
+# Histograma ise body tamamen gönderildikten sonraki toplam süre yazılır.
+
+class ProcessTimeMiddleware:
+    def __init__(self, app, metrics: RequestMetrics):
+        self.app = app
+        self.metrics = metrics
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":  # websocket, lifespan → olduğu gibi geçir
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        start_time = time.perf_counter()
+        status_code = 500  # Cevap başlamadan hata olursa 500 sayılır
+        self.metrics.request_started(method)
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                process_time = time.perf_counter() - start_time
+                headers = list(message.get("headers", []))
+                headers.append((b"x-process-time", str(process_time).encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            self.metrics.request_finished(
+                method, route_label(scope), status_code, time.perf_counter() - start_time
+            )
+
+
+# 1c) Hangi middleware kullanılacak?
+# MIDDLEWARE_MODE=asgi (varsayılan) → ProcessTimeMiddleware
+# MIDDLEWARE_MODE=http → eski add_process_time_header (karşılaştırma için)
+MIDDLEWARE_MODE = os.getenv("MIDDLEWARE_MODE", "asgi")
+
+
+def install_timing_middleware(target: FastAPI, mode: str, target_metrics: RequestMetrics):
+    if mode == "http":
+        # Fonksiyon global metrics'e yazar; benchmark'ta ayrı sayaç istenirse asgi kullanılmalı
+        target.middleware("http")(add_process_time_header)
+    else:
+        target.add_middleware(ProcessTimeMiddleware, metrics=target_metrics)
+
+
+install_timing_middleware(app, MIDDLEWARE_MODE, metrics)
+
+
 # 2) Normal bir endpoint
 # Middleware bu endpoint çalışmadan ÖNCE ve SONRA devreye girer
 
@@ -42,3 +195,122 @@ async def add_process_time_header(request: Request, call_next): #call_next → 
 async def hello():
     return {"message": "Merhaba! Middleware çalıştı mı? Headerlara bak!"}
 
+
+# 2b) Büyük streaming cevap
+# chunks x 64 KiB veri parça parça gönderilir; middleware'in body'ye dokunup dokunmadığı burada belli olur.
+STREAM_CHUNK = b"x" * 65536
+
+
+@app.get("/stream")
+async def stream(chunks: int = 256):
+    async def generate():
+        for _ in range(chunks):
+            yield STREAM_CHUNK
+
+    return StreamingResponse(generate(), media_type="application/octet-stream")
+
+
+# 3) METRİK ENDPOINT'İ
+# Prometheus bu adresi periyodik olarak okur (scrape).
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def read_metrics():
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+
+# 4) BENCHMARK
+# Sadece "python middleware.py" ile çalıştırıldığında devreye girer.
+
+def benchmark_metrics_overhead(requests: int = 200_000):
+    """
+    Middleware'in metrik için yaptığı ek işin (sayaç artırma, route okuma, histograma yazma)
+    istek başına maliyetini ölçer. Hedef: birkaç mikrosaniyenin altı.
+    """
+    from starlette.routing import Match
+
+    bench_metrics = RequestMetrics()
+    scope = {"type": "http", "method": "GET", "path": "/hello"}
+    for route in app.routes:  # Router'ın yaptığı gibi route'u scope'a yerleştir
+        if route.matches(scope)[0] == Match.FULL:
+            scope["route"] = route
+
+    start = time.perf_counter()
+    for i in range(requests):
+        started = time.perf_counter()
+        bench_metrics.request_started("GET")
+        bench_metrics.request_finished("GET", route_label(scope), 200, time.perf_counter() - started)
+    per_request_us = (time.perf_counter() - start) / requests * 1_000_000
+    print(f"metrik maliyeti: {per_request_us:.2f} µs / istek")
+
+
+async def drive_asgi(target, path: str, query: bytes = b"") -> int:
+    """
+    Uygulamayı ağ olmadan, doğrudan ASGI arayüzünden çağırır ve gönderilen body byte'larını sayar.
+    Böylece ölçüm HTTP sunucusunun değil sadece uygulama + middleware'in maliyetini gösterir.
+    """
+    import asyncio
+
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1",
+        "method": "GET", "scheme": "http", "path": path, "raw_path": path.encode(),
+        "root_path": "", "query_string": query, "headers": [],
+        "client": ("127.0.0.1", 50000), "server": ("127.0.0.1", 8000),
+    }
+    received = 0
+    request_sent = False
+    response_done = asyncio.Event()
+
+    async def receive():
+        # Gerçek sunucu gibi: önce (boş) body, sonra istemci bağlantıyı kapatana kadar bekle
+        nonlocal request_sent
+        if not request_sent:
+            request_sent = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        await response_done.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        nonlocal received
+        if message["type"] == "http.response.body":
+            received += len(message.get("body", b""))
+            if not message.get("more_body", False):
+                response_done.set()
+
+    await target(scope, receive, send)
+    return received
+
+
+def benchmark_middleware_modes(hello_requests: int = 5000, stream_requests: int = 20, stream_chunks: int = 256):
+    """
+    Aynı route'ları iki ayrı uygulamaya bağlayıp eski (http) ve yeni (asgi) middleware'i karşılaştırır:
+    - /hello → küçük JSON, istek başına sabit maliyet
+    - /stream → stream_chunks x 64 KiB, body taşıma maliyeti
+    """
+    import asyncio
+
+    async def run():
+        for mode in ("http", "asgi"):
+            bench_app = FastAPI()
+            bench_app.router.routes.extend(app.router.routes)
+            install_timing_middleware(bench_app, mode, RequestMetrics())
+
+            await drive_asgi(bench_app, "/hello")  # Middleware yığını ilk istekte kurulur
+            start = time.perf_counter()
+            for _ in range(hello_requests):
+                await drive_asgi(bench_app, "/hello")
+            hello_rps = hello_requests / (time.perf_counter() - start)
+
+            total_bytes = 0
+            start = time.perf_counter()
+            for _ in range(stream_requests):
+                total_bytes += await drive_asgi(bench_app, "/stream", f"chunks={stream_chunks}".encode())
+            stream_mib_s = total_bytes / (time.perf_counter() - start) / 2**20
+
+            print(f"{mode:5s} /hello: {hello_rps:8.0f} istek/sn   /stream: {stream_mib_s:8.0f} MiB/sn")
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    benchmark_metrics_overhead()
+    benchmark_middleware_modes()
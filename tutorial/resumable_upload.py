@@ -0,0 +1,257 @@
+# RESUMABLE UPLOAD — kaldığı yerden devam edebilen parçalı yükleme
+# file_handling.py bu dosyayı kullanır.
+#
+# Neden?
+# /upload-file/ ve /upload-multiple/ tek parça multipart body bekler.
+# 5 GB'lık yüklemenin %90'ında bağlantı koparsa her şey baştan gönderilir.
+#
+# Protokol:
+# 1) create   → dosya adı ve toplam boyut bildirilir, upload_id alınır; dosya diskte önceden ayrılır
+# 2) chunk    → her parça kendi offset'i ve SHA-256'sı ile gönderilir; checksum tutarsa os.pwrite ile yerine yazılır
+#               Parçalar herhangi bir sırada, hatta aynı anda gelebilir
+# 3) status   → hangi byte aralıklarının alındığı / eksik olduğu sorulur (bağlantı koptuktan sonra)
+# 4) finalize → tüm aralıklar tamamsa dosya hedef klasöre taşınır
+#
+# Oturum bilgisi (alınan aralıklar) her parçadan sonra <id>.json olarak diske yazılır,
+# böylece sunucu yeniden başlasa bile yükleme devam edebilir.
+#
+# create diskte yer ayırdığı için sınırsız bırakılamaz:
+# - session_ttl boyunca hiç parça gelmeyen oturum süresi dolmuş sayılır, dosyaları silinir (sweep)
+# - Aynı anda en fazla max_sessions oturum ve toplam max_reserved_bytes ayrılmış yer olabilir
+
+import hashlib
+import json
+import os
+import threading
+import time
+import uuid
+
+COPY_BUFFER = 1024 * 1024
+
+
+class UploadError(Exception):
+    """İstemci hatası (yanlış offset, checksum uyuşmuyor, eksik parça ...). Endpoint 4xx'e çevirir."""
+
+    def __init__(self, status_code: int, detail: str):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+
+
+def merge_range(ranges: list[list[int]], start: int, end: int) -> list[list[int]]:
+    """[start, end) aralığını sıralı ve çakışmasız aralık listesine ekler."""
+    merged = []
+    for r_start, r_end in sorted(ranges + [[start, end]]):
+        if merged and r_start <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], r_end)
+        else:
+            merged.append([r_start, r_end])
+    return merged
+
+
+class ResumableUploadStore:
+    """
+    session_dir → yarım dosyaların ve oturum bilgilerinin tutulduğu klasör
+    target_dir → finalize sonrası dosyanın taşınacağı klasör
+    session_ttl → son parçadan bu kadar saniye sonra oturum silinir
+    max_sessions / max_reserved_bytes → açık oturum sayısı ve toplam ayrılmış disk sınırı
+    Metotlar bloklayan I/O yapar; endpoint'lerden thread havuzunda çağrılmalı.
+    """
+
+    def __init__(
+        self,
+        session_dir: str,
+        target_dir: str,
+        max_size: int,
+        *,
+        session_ttl: float = 24 * 3600,
+        max_sessions: int = 100,
+        max_reserved_bytes: int | None = None,
+    ):
+        self.session_dir = session_dir
+        self.target_dir = target_dir
+        self.max_size = max_size
+        self.session_ttl = session_ttl
+        self.max_sessions = max_sessions
+        self.max_reserved_bytes = max_reserved_bytes if max_reserved_bytes is not None else 4 * max_size
+        self._lock = threading.Lock()  # Aynı anda gelen parçalar meta dosyasını ezmesin
+
+    # 1) OTURUM
+
+    def _paths(self, upload_id: str) -> tuple[str, str]:
+        if not upload_id.isalnum():  # uuid hex → sadece harf/rakam; ../ gibi şeyleri engeller
+            raise UploadError(404, "Yükleme bulunamadı")
+        base = os.path.join(self.session_dir, upload_id)
+        return base + ".data", base + ".json"
+
+    def _load(self, upload_id: str) -> dict:
+        _, meta_path = self._paths(upload_id)
+        try:
+            with open(meta_path, encoding="utf-8") as f:
+                meta = json.load(f)
+        except FileNotFoundError:
+            raise UploadError(404, "Yükleme bulunamadı") from None
+        if self._expired(meta, time.time()):
+            self._delete(upload_id)
+            raise UploadError(404, "Yüklemenin süresi doldu")
+        return meta
+
+    def _save(self, meta: dict):
+        _, meta_path = self._paths(meta["upload_id"])
+        meta["updated_at"] = time.time()  # Her parça oturumun süresini uzatır
+        tmp_path = meta_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+        os.replace(tmp_path, meta_path)  # Yarım yazılmış meta dosyası kalmaz
+
+    def _expired(self, meta: dict, now: float) -> bool:
+        return meta.get("updated_at", 0) + self.session_ttl < now
+
+    def _delete(self, upload_id: str):
+        for path in self._paths(upload_id):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def sweep(self) -> list[dict]:
+        """
+        Süresi dolmuş oturumları ve sahipsiz dosyaları (çökme sonrası kalan .data / .tmp) siler.
+        Canlı oturumların meta bilgilerini döner.
+        """
+        now = time.time()
+        live = []
+        try:
+            names = os.listdir(self.session_dir)
+        except FileNotFoundError:
+            return live
+        for name in names:
+            path = os.path.join(self.session_dir, name)
+            upload_id, ext = os.path.splitext(name)
+            if ext == ".json":
+                try:
+                    with open(path, encoding="utf-8") as f:
+                        meta = json.load(f)
+                except (FileNotFoundError, json.JSONDecodeError):
+                    continue
+                if self._expired(meta, now):
+                    self._delete(upload_id)
+                else:
+                    live.append(meta)
+            elif ext in (".data", ".tmp") and not os.path.exists(os.path.join(self.session_dir, upload_id + ".json")):
+                try:
+                    if os.path.getmtime(path) + self.session_ttl < now:
+                        os.remove(path)
+                except FileNotFoundError:
+                    pass
+        return live
+
+    def create(self, filename: str, size: int) -> dict:
+        if size < 0 or size > self.max_size:
+            raise UploadError(413, f"Dosya en fazla {self.max_size} byte olabilir")
+        os.makedirs(self.session_dir, exist_ok=True)
+        with self._lock:  # Sınır kontrolü ile yer ayırma arasına başka create girmesin
+            live = self.sweep()
+            if len(live) >= self.max_sessions:
+                raise UploadError(429, "Çok fazla açık yükleme var, daha sonra tekrar deneyin")
+            if sum(meta["size"] for meta in live) + size > self.max_reserved_bytes:
+                raise UploadError(507, "Yüklemeler için ayrılabilecek disk alanı doldu")
+
+            upload_id = uuid.uuid4().hex
+            data_path, _ = self._paths(upload_id)
+            fd = os.open(data_path, os.O_WRONLY | os.O_CREAT, 0o600)
+            try:
+                # Yer baştan ayrılır: disk yetmiyorsa ilk parçada değil şimdi hata alınır
+                if size and hasattr(os, "posix_fallocate"):
+                    os.posix_fallocate(fd, 0, size)
+                else:
+                    os.ftruncate(fd, size)
+            finally:
+                os.close(fd)
+            meta = {"upload_id": upload_id, "filename": filename, "size": size, "received": []}
+            self._save(meta)
+        return self.status(upload_id)
+
+    def status(self, upload_id: str) -> dict:
+        meta = self._load(upload_id)
+        missing, position = [], 0
+        for start, end in meta["received"]:
+            if start > position:
+                missing.append([position, start])
+            position = end
+        if position < meta["size"]:
+            missing.append([position, meta["size"]])
+        return {
+            "upload_id": upload_id,
+            "filename": meta["filename"],
+            "size": meta["size"],
+            "received_bytes": sum(end - start for start, end in meta["received"]),
+            "received": meta["received"],
+            "missing": missing,
+        }
+
+    # 2) PARÇA YAZMA
+
+    def write_chunk(self, upload_id: str, offset: int, source, sha256: str) -> dict:
+        """
+        source → okunabilir ve başa sarılabilir dosya nesnesi (UploadFile.file, zaten yerel bir geçici dosya).
+        Sıra önemli: önce sınırlar, sonra checksum, EN SON yazma.
+        Böylece bozuk bir parça daha önce doğrulanmış byte'ların üzerine asla yazılmaz.
+        """
+        meta = self._load(upload_id)
+        data_path, _ = self._paths(upload_id)
+
+        # 1. Sınır kontrolü: tek byte yazılmadan önce
+        source.seek(0, os.SEEK_END)
+        length = source.tell()
+        if offset < 0 or offset + length > meta["size"]:
+            raise UploadError(416, "Parça dosya sınırlarının dışında")
+
+        # 2. Checksum: parça okunur ama diske yazılmaz
+        source.seek(0)
+        hasher = hashlib.sha256()
+        while data := source.read(COPY_BUFFER):
+            hasher.update(data)
+        if hasher.hexdigest() != sha256.lower():
+            raise UploadError(400, "Parçanın SHA-256 değeri uyuşmuyor, tekrar gönderin")
+
+        # 3. Doğrulanmış parça offset'ine yazılır
+        source.seek(0)
+        written = 0
+        fd = os.open(data_path, os.O_WRONLY)
+        try:
+            while data := source.read(COPY_BUFFER):
+                os.pwrite(fd, data, offset + written)  # Dosya konumunu değiştirmez → aynı anda güvenli
+                written += len(data)
+        finally:
+            os.close(fd)
+
+        with self._lock:
+            meta = self._load(upload_id)  # Başka parçalar bu arada eklenmiş olabilir
+            if written:
+                meta["received"] = merge_range(meta["received"], offset, offset + written)
+            self._save(meta)
+        return self.status(upload_id)
+
+    # 3) TAMAMLAMA
+
+    def finalize(self, upload_id: str, sha256: str | None = None) -> dict:
+        """Eksik aralık yoksa dosyayı target_dir'e taşır. sha256 verilirse tüm dosya doğrulanır."""
+        info = self.status(upload_id)
+        if info["missing"]:
+            raise UploadError(409, f"Eksik aralıklar var: {info['missing']}")
+        data_path, meta_path = self._paths(upload_id)
+
+        hasher = hashlib.sha256()
+        with open(data_path, "rb") as f:
+            while data := f.read(COPY_BUFFER):
+                hasher.update(data)
+        digest = hasher.hexdigest()
+        if sha256 is not None and digest != sha256.lower():
+            raise UploadError(400, "Dosyanın SHA-256 değeri uyuşmuyor")
+
+        os.makedirs(self.target_dir, exist_ok=True)
+        target = os.path.join(self.target_dir, os.path.basename(info["filename"]))
+        os.replace(data_path, target)
+        os.remove(meta_path)
+        return {"filename": os.path.basename(target), "size": info["size"], "sha256": digest}
@@ -2,16 +2,30 @@
 # Bu dosya gerçek projelerde kullanılabilir güvenli bir örnektir.
 
 
+import asyncio
+import hashlib
+import math
+import os
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta, timezone
+from pathlib import Path
 from typing import Annotated
 
 import jwt  # JWT üretme/doğrulama paketi
-from fastapi import Depends, FastAPI, HTTPException, status
+from fastapi import Depends, FastAPI, HTTPException, Request, status
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from jwt.exceptions import InvalidTokenError
 from pwdlib import PasswordHash  # Argon2 tabanlı güvenli hashing kütüphanesi
+from pwdlib.hashers.argon2 import Argon2Hasher
 from pydantic import BaseModel
 
+from rate_limiter import LoginRateLimiter  # Aynı klasördeki ortak katman
+from user_repository import DictUserStore, UserRepository  # Aynı klasördeki ortak katman
+
 
 # 1) GÜVENLİK AYARLARI
 
@@ -28,6 +42,9 @@ ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 
 
+app = FastAPI()
+
+
 # 2) SAHTE VERİTABANI — hashed_password artık Argon2 hash'i
 
 fake_users_db = {
@@ -71,7 +88,34 @@ class UserInDB(User):
 
 # 4) PASSWORD HASHING (Argon2)
 
-password_hash = PasswordHash.recommended()  # En güvenli Argon2 ayarları
+# Argon2 maliyet profilleri
+# - memory_cost → KiB cinsinden bellek (65536 = 64 MB)
+# - time_cost → bellek üzerinden kaç tur geçileceği
+# - parallelism → kaç paralel şerit (lane) kullanılacağı
+# Maliyet arttıkça hem saldırgan hem de sunucu için hash hesaplamak pahalılaşır.
+# Her sunucu sınıfı için uygun değerler "python fastapi_security_jwt.py calibrate 50" ile bulunabilir.
+ARGON2_PROFILES = {
+    "low": {"time_cost": 2, "memory_cost": 19456, "parallelism": 1},  # OWASP alt sınırı
+    "default": {"time_cost": 3, "memory_cost": 65536, "parallelism": 4},  # PasswordHash.recommended() ile aynı
+    "high": {"time_cost": 4, "memory_cost": 131072, "parallelism": 4},
+}
+
+
+def load_argon2_params() -> dict:
+    """
+    Profil ARGON2_PROFILE ile seçilir, tek tek değerler ortam değişkeniyle ezilebilir:
+      ARGON2_PROFILE=low ARGON2_MEMORY_COST=32768 fastapi dev fastapi_security_jwt.py
+    """
+    params = dict(ARGON2_PROFILES[os.getenv("ARGON2_PROFILE", "default")])
+    for name in params:
+        value = os.getenv(f"ARGON2_{name.upper()}")
+        if value is not None:
+            params[name] = int(value)
+    return params
+
+
+ARGON2_PARAMS = load_argon2_params()
+password_hash = PasswordHash((Argon2Hasher(**ARGON2_PARAMS),))
 
 def verify_password(plain_password, hashed_password):
     """Kullanıcı girdiği şifre doğru mu?"""
@@ -82,6 +126,54 @@ def get_password_hash(password):
     return password_hash.hash(password)
 
 
+# Argon2 bilerek yavaştır (m=65536, t=3 → onlarca ms CPU).
+# async endpoint içinde doğrudan çağrılırsa event loop o süre boyunca başka hiçbir isteğe bakamaz.
+# Bu yüzden hash/verify işleri sınırlı sayıda thread'li ayrı bir havuzda çalışır
+# (argon2 C kodu çalışırken GIL'i bırakır, thread'ler gerçekten paralel çalışır).
+# - workers → aynı anda kaç hash hesaplanabilir
+# - max_pending → çalışan + sırada bekleyen iş sınırı. Aşılırsa yeni iş kuyruğa alınmaz, 503 döner.
+#   Böylece bir login fırtınası bellekte sınırsız kuyruk biriktiremez.
+# workers=0 → eski davranış (event loop üzerinde doğrudan çalıştır)
+
+class PasswordWorkerPool:
+    def __init__(self, workers: int = 4, max_pending: int = 32):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.pending = 0  # Sadece event loop thread'inden değişir, kilit gerekmez
+        self.rejected = 0
+        self._executor = (
+            ThreadPoolExecutor(max_workers=workers, thread_name_prefix="argon2")
+            if workers
+            else None
+        )
+
+    async def run(self, func, *args):
+        if self._executor is None:
+            return func(*args)
+        if self.pending >= self.max_pending:
+            self.rejected += 1
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Sunucu meşgul, lütfen tekrar deneyin.",
+                headers={"Retry-After": "1"},
+            )
+        self.pending += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
+        finally:
+            self.pending -= 1
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+
+
+password_pool = PasswordWorkerPool(
+    workers=int(os.getenv("PASSWORD_POOL_WORKERS", "4")),
+    max_pending=int(os.getenv("PASSWORD_POOL_MAX_PENDING", "32")),
+)
+
+
 
 # 5) KULLANICI FONKSİYONLARI
 
@@ -91,6 +183,16 @@ def get_user(db, username: str):
         return UserInDB(**db[username])
 
 
+# Sık çağrılan yollar (token doğrulama, login) get_user yerine repository kullanır:
+# UserInDB bir kez oluşturulur ve USER_CACHE_TTL saniye boyunca tekrar kullanılır (0 → kapalı).
+# Kullanıcı değişirse users.update(...) / users.set_disabled(...) çağrılmalı.
+users = UserRepository(
+    DictUserStore(fake_users_db),
+    UserInDB,
+    ttl=float(os.getenv("USER_CACHE_TTL", "60")),
+)
+
+
 def authenticate_user(fake_db, username: str, password: str):
     """
     Login işleminde:
@@ -106,6 +208,262 @@ def authenticate_user(fake_db, username: str, password: str):
     return user
 
 
+def verify_and_rehash(repository: UserRepository, user: UserInDB, password: str) -> bool:
+    """
+    Şifreyi doğrular. Şifre doğruysa ve kayıtlı hash eski parametrelerle üretilmişse
+    (ör. profil değişti) şifre yeni parametrelerle tekrar hashlenip DB'ye yazılır.
+    Kullanıcı bir şey fark etmez; bir sonraki login'de yeni maliyet geçerli olur.
+    """
+    valid, updated_hash = password_hash.verify_and_update(password, user.hashed_password)
+    if valid and updated_hash is not None:
+        repository.update(user.username, hashed_password=updated_hash)
+    return valid
+
+
+async def authenticate_user_async(repository: UserRepository, username: str, password: str):
+    """authenticate_user ile aynı, ama Argon2 doğrulaması event loop dışında çalışır."""
+    user = repository.get(username)
+    if not user:
+        return False
+    if not await password_pool.run(verify_and_rehash, repository, user, password):
+        return False
+    return user
+
+
+
+# 5b) İMZA ANAHTARLARI (KEY RING)
+# HS256'da imzalayan ve doğrulayan aynı SECRET_KEY'i bilmek zorundadır.
+# RS256 / ES256 / EdDSA gibi asimetrik algoritmalarda token özel (private) anahtarla imzalanır,
+# diğer servisler sadece açık (public) anahtarla doğrular → imza sırrı paylaşılmaz.
+# KeyRing birden fazla anahtarı kid (key id) ile tutar:
+# - Token header'ına "kid" yazılır, doğrulamada o kid'in anahtarı kullanılır
+# - Anahtarlar bir kez parse edilip nesne olarak saklanır → her istekte PEM okunmaz
+# - rotate() yeni anahtar üretir; eski anahtar, imzaladığı token'lar bitene kadar doğrulama için kalır
+# - jwks() açık anahtarları JWKS formatında verir (/.well-known/jwks.json)
+# Asimetrik algoritmalar için gerekli paket: pip install "pyjwt[crypto]"
+
+# kid içermeyen eski token'lar bu anahtarla (SECRET_KEY) doğrulanır
+LEGACY_KID = "hs256-legacy"
+
+
+class JwtKey:
+    def __init__(self, kid: str, algorithm: str, signing_key, verifying_key):
+        self.kid = kid
+        self.algorithm = algorithm
+        self.signing_key = signing_key  # None → sadece doğrulama anahtarı (başka servisin public key'i)
+        self.verifying_key = verifying_key
+        self.created_at = time.time()
+        self.retired_at: float | None = None  # Artık imza atmıyor, sadece doğruluyor
+
+    @property
+    def is_symmetric(self) -> bool:
+        return self.algorithm.startswith("HS")
+
+
+def generate_jwt_key(algorithm: str, kid: str | None = None) -> JwtKey:
+    """İstenen algoritma için bellekte yeni bir anahtar üretir."""
+    kid = kid or f"{algorithm.lower()}-{int(time.time())}-{secrets.token_hex(4)}"
+    if algorithm.startswith("HS"):
+        secret = secrets.token_bytes(32)
+        return JwtKey(kid, algorithm, secret, secret)
+
+    from cryptography.hazmat.primitives.asymmetric import ec, ed25519, rsa
+
+    if algorithm == "RS256":
+        private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    elif algorithm == "ES256":
+        private_key = ec.generate_private_key(ec.SECP256R1())
+    elif algorithm == "EdDSA":
+        private_key = ed25519.Ed25519PrivateKey.generate()
+    else:
+        raise ValueError(f"Desteklenmeyen algoritma: {algorithm}")
+    return JwtKey(kid, algorithm, private_key, private_key.public_key())
+
+
+def load_jwt_key_from_pem(path: Path) -> JwtKey:
+    """
+    PEM dosyasından anahtar yükler. kid = dosya adı (uzantısız).
+    Özel anahtar → imza + doğrulama, açık anahtar → sadece doğrulama.
+    Algoritma anahtar tipinden çıkarılır (RSA → RS256, EC P-256 → ES256, Ed25519 → EdDSA).
+    """
+    from cryptography.hazmat.primitives.asymmetric import ec, ed25519, rsa
+    from cryptography.hazmat.primitives.serialization import (
+        load_pem_private_key,
+        load_pem_public_key,
+    )
+
+    data = path.read_bytes()
+    try:
+        private_key = load_pem_private_key(data, password=None)
+        public_key = private_key.public_key()
+    except ValueError:
+        private_key = None
+        public_key = load_pem_public_key(data)
+
+    if isinstance(public_key, rsa.RSAPublicKey):
+        algorithm = "RS256"
+    elif isinstance(public_key, ec.EllipticCurvePublicKey):
+        # ES256 sadece P-256 demektir; P-384 (ES384) vb. yanlış etiketlenmesin
+        if not isinstance(public_key.curve, ec.SECP256R1):
+            raise ValueError(f"Desteklenmeyen EC eğrisi ({public_key.curve.name}), P-256 olmalı: {path}")
+        algorithm = "ES256"
+    elif isinstance(public_key, ed25519.Ed25519PublicKey):
+        algorithm = "EdDSA"
+    else:
+        raise ValueError(f"Desteklenmeyen anahtar tipi: {path}")
+    return JwtKey(path.stem, algorithm, private_key, public_key)
+
+
+class KeyRing:
+    def __init__(self, algorithm: str = "HS256", token_lifetime: float = 30 * 60):
+        self.algorithm = algorithm  # rotate() ile üretilecek anahtarların algoritması
+        self.token_lifetime = token_lifetime  # Emekli anahtar en az bu kadar saklanır
+        self.keys: dict[str, JwtKey] = {}
+        self.current_kid: str | None = None
+
+    @property
+    def current(self) -> JwtKey:
+        return self.keys[self.current_kid]
+
+    def add(self, key: JwtKey, make_current: bool = False):
+        self.keys[key.kid] = key
+        if make_current:
+            self._set_current(key.kid)
+
+    def _set_current(self, kid: str):
+        if self.current_kid is not None and self.current_kid != kid:
+            self.keys[self.current_kid].retired_at = time.time()
+        self.current_kid = kid
+        self.keys[kid].retired_at = None
+
+    def load_pem_dir(self, directory: str, current_kid: str | None = None):
+        """
+        Klasördeki tüm *.pem dosyalarını yükler.
+        current_kid verilmezse imza atabilen anahtarlardan adı alfabetik olarak en sonda olan seçilir
+        (dosyaları tarih ile adlandırmak yeterli: 2025-01-rs.pem, 2025-02-rs.pem ...).
+        """
+        loaded = [load_jwt_key_from_pem(path) for path in sorted(Path(directory).glob("*.pem"))]
+        for key in loaded:
+            self.add(key)
+        signers = [key.kid for key in loaded if key.signing_key is not None]
+        if current_kid or signers:
+            self._set_current(current_kid or signers[-1])
+
+    def rotate(self, key: JwtKey | None = None) -> JwtKey:
+        """
+        Yeni anahtarı aktif yapar, süresi geçmiş emekli anahtarları siler.
+        key verilmezse burada üretilir (RSA'da ~100 ms CPU → event loop'tan önceden üretip verin).
+        """
+        key = key or generate_jwt_key(self.algorithm)
+        self.add(key, make_current=True)
+        self.prune()
+        return key
+
+    def is_expired(self, key: JwtKey) -> bool:
+        """Emekli anahtarın imzaladığı son token'ın da süresi dolduysa True."""
+        return key.retired_at is not None and key.retired_at + self.token_lifetime < time.time()
+
+    def valid_until(self, token: str) -> float:
+        """Token'ı imzalayan anahtarın ne zamana kadar kabul edileceği (önbellek süresini sınırlamak için)."""
+        key = self.keys.get(jwt.get_unverified_header(token).get("kid", LEGACY_KID))
+        if key is None or key.retired_at is None:
+            return math.inf
+        return key.retired_at + self.token_lifetime
+
+    def prune(self):
+        """Süresi geçmiş emekli anahtarları siler."""
+        for kid in [kid for kid, key in self.keys.items() if self.is_expired(key)]:
+            del self.keys[kid]
+
+    def sign(self, payload: dict) -> str:
+        key = self.current
+        return jwt.encode(payload, key.signing_key, algorithm=key.algorithm, headers={"kid": key.kid})
+
+    def verify(self, token: str) -> dict:
+        """
+        Header'daki kid ile anahtarı bulur ve SADECE o anahtarın algoritmasıyla doğrular
+        (token'daki "alg" değerine güvenilmez → algoritma karıştırma saldırısı engellenir).
+        Emekli anahtarlar rotasyon açık olmasa da token_lifetime dolunca reddedilir; exp'siz token kabul edilmez.
+        """
+        kid = jwt.get_unverified_header(token).get("kid", LEGACY_KID)
+        key = self.keys.get(kid)
+        if key is None:
+            raise InvalidTokenError(f"Bilinmeyen kid: {kid}")
+        if self.is_expired(key):
+            self.prune()
+            raise InvalidTokenError(f"Anahtarın süresi doldu: {kid}")
+        return jwt.decode(token, key.verifying_key, algorithms=[key.algorithm], options={"require": ["exp"]})
+
+    def jwks(self) -> dict:
+        """Açık anahtarların JWKS listesi. Simetrik (HS*) anahtarlar asla yayınlanmaz."""
+        algorithms = jwt.algorithms.get_default_algorithms()
+        keys = []
+        for key in self.keys.values():
+            if key.is_symmetric:
+                continue
+            jwk = algorithms[key.algorithm].to_jwk(key.verifying_key, as_dict=True)
+            keys.append({**jwk, "kid": key.kid, "alg": key.algorithm, "use": "sig"})
+        return {"keys": keys}
+
+
+# Ayarlar:
+#   JWT_ALGORITHM=RS256           → yeni token'lar hangi algoritmayla imzalanacak (varsayılan HS256)
+#   JWT_KEYS_DIR=./keys           → PEM dosyalarının bulunduğu klasör
+#   JWT_CURRENT_KID=2025-02-rs    → imza için kullanılacak anahtar
+#   JWT_KEY_ROTATION_MINUTES=60   → bu aralıkla bellekte yeni anahtar üret (0 → kapalı)
+#   JWT_ACCEPT_LEGACY_TOKENS=1    → HS256 dışı algoritmaya geçerken kid'siz (SECRET_KEY ile imzalı)
+#                                   token'ları bir token süresi boyunca daha kabul et (varsayılan kapalı)
+# Not: Bellekte üretilen anahtarlar her süreçte farklıdır. Birden fazla süreç/sunucu varsa
+# anahtarlar PEM dosyası olarak dağıtılmalı, rotasyon dosya değiştirilerek yapılmalıdır.
+JWT_ALGORITHM = os.getenv("JWT_ALGORITHM", ALGORITHM)
+JWT_KEY_ROTATION_MINUTES = float(os.getenv("JWT_KEY_ROTATION_MINUTES", "0"))
+JWT_ACCEPT_LEGACY_TOKENS = os.getenv("JWT_ACCEPT_LEGACY_TOKENS", "0") == "1"
+
+key_ring = KeyRing(algorithm=JWT_ALGORITHM, token_lifetime=ACCESS_TOKEN_EXPIRE_MINUTES * 60)
+# SECRET_KEY sadece HS256 modunda veya açıkça istenirse eklenir: asimetrik imzaya geçildiyse
+# koddaki sabit sır ile imzalanmış kid'siz token'lar kabul edilmemeli
+if JWT_ALGORITHM == ALGORITHM or JWT_ACCEPT_LEGACY_TOKENS:
+    key_ring.add(
+        JwtKey(LEGACY_KID, ALGORITHM, SECRET_KEY, SECRET_KEY),
+        make_current=JWT_ALGORITHM == ALGORITHM,
+    )
+if os.getenv("JWT_KEYS_DIR"):
+    key_ring.load_pem_dir(os.environ["JWT_KEYS_DIR"], os.getenv("JWT_CURRENT_KID"))
+if key_ring.current_kid is None or key_ring.current.algorithm != JWT_ALGORITHM:
+    key_ring.rotate()  # İstenen algoritmada anahtar yoksa bellekte üret
+if LEGACY_KID in key_ring.keys and key_ring.current_kid != LEGACY_KID:
+    key_ring.keys[LEGACY_KID].retired_at = time.time()  # Eski token'lar bir token süresi sonra reddedilir
+
+
+async def rotate_keys_periodically():
+    while True:
+        await asyncio.sleep(JWT_KEY_ROTATION_MINUTES * 60)
+        # Anahtar üretimi (RSA-2048 ~100 ms) thread'de: bu sürede diğer istekler beklemez.
+        # Değiştirme event loop'ta yapılır → verify/sign hiçbir zaman yarım bir key ring görmez.
+        key = await asyncio.to_thread(generate_jwt_key, key_ring.algorithm)
+        key_ring.rotate(key)
+
+
+@app.on_event("startup")
+async def start_key_rotation():
+    if JWT_KEY_ROTATION_MINUTES > 0:
+        app.state.key_rotation_task = asyncio.create_task(rotate_keys_periodically())
+
+
+@app.on_event("shutdown")
+async def stop_key_rotation():
+    task = getattr(app.state, "key_rotation_task", None)
+    if task is not None:
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+
+
+@app.get("/.well-known/jwks.json")
+async def read_jwks():
+    """Diğer servislerin token doğrulamak için indirdiği açık anahtarlar."""
+    return key_ring.jwks()
+
+
 
 # 6) JWT ÜRETME FONKSİYONU
 
@@ -120,8 +478,11 @@ def create_access_token(data: dict, expires_delta: timedelta | None = None):
     expire = datetime.now(timezone.utc) + (expires_delta or timedelta(minutes=15))
     to_encode.update({"exp": expire})
 
-    # Token üret
-    encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
+    # Benzersiz token kimliği → token'ı süresi dolmadan iptal edebilmek için
+    to_encode.setdefault("jti", secrets.token_urlsafe(16))
+
+    # Token üret (aktif anahtarla imzalanır, header'a kid eklenir)
+    encoded_jwt = key_ring.sign(to_encode)
     return encoded_jwt
 
 
@@ -131,7 +492,172 @@ def create_access_token(data: dict, expires_delta: timedelta | None = None):
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
 
-# 8) TOKEN'I DOĞRULAYAN DEPENDENCY
+# 8) TOKEN DOĞRULAMA ÖNBELLEĞİ
+# Her istekte jwt.decode (HMAC hesaplama) ve UserInDB oluşturma (Pydantic doğrulama) yapılır.
+# Aynı istemci aynı token'ı tekrar tekrar gönderdiği için sonuç önbellekte tutulur:
+# - Anahtar token'ın kendisi değil SHA-256 özetidir (bellekte ham token tutulmaz)
+# - Kayıt token'ın exp zamanına kadar geçerlidir, sonra otomatik düşer
+# - maxsize dolunca en uzun süredir kullanılmayan kayıt atılır (LRU)
+# - invalidate / invalidate_user → token iptali veya kullanıcı değişikliğinde çağrılır
+#   invalidate_user şifre yeniden hashlenince argon2 thread'inden de çağrılır → kilitli
+
+class TokenCache:
+    def __init__(self, maxsize: int = 10_000):
+        self.maxsize = maxsize
+        self._data: OrderedDict[bytes, tuple[float, UserInDB, str | None]] = OrderedDict()
+        self._lock = threading.Lock()  # users.update → invalidate_user havuz thread'inde çalışabilir
+        self._generation = 0  # invalidate_user / clear ile artar (bkz. generation)
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _key(token: str) -> bytes:
+        return hashlib.sha256(token.encode()).digest()
+
+    def get(self, token: str) -> tuple[UserInDB, str | None] | None:
+        """Önbellekte varsa (kullanıcı, jti) döner."""
+        key = self._key(token)
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, user, jti = entry
+            if expires_at <= time.time():  # Token süresi dolmuş → jwt.decode zaten reddedecek
+                del self._data[key]
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return user, jti
+
+    def generation(self) -> int:
+        """Kullanıcı okunmadan ÖNCE alınır: arada invalidate_user çalıştıysa set eski kullanıcıyı yazmaz."""
+        with self._lock:
+            return self._generation
+
+    def set(
+        self, token: str, user: UserInDB, expires_at: float, jti: str | None = None, generation: int | None = None
+    ):
+        if not self.maxsize:  # maxsize=0 → önbellek kapalı
+            return
+        key = self._key(token)
+        with self._lock:
+            if generation is not None and generation != self._generation:
+                return
+            self._data[key] = (expires_at, user, jti)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def invalidate(self, token: str):
+        """Tek bir token'ı önbellekten çıkarır (ör. logout / iptal)."""
+        key = self._key(token)
+        with self._lock:
+            self._data.pop(key, None)
+
+    def invalidate_user(self, username: str):
+        """Kullanıcının tüm token'larını çıkarır (ör. disabled değişti, şifre değişti)."""
+        with self._lock:
+            for key in [key for key, (_, user, _) in self._data.items() if user.username == username]:
+                del self._data[key]
+            self._generation += 1
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._generation += 1
+
+
+# TOKEN_CACHE_SIZE=0 → önbellek kapalı
+token_cache = TokenCache(maxsize=int(os.getenv("TOKEN_CACHE_SIZE", "10000")))
+
+# Kullanıcı değişince (disabled, şifre) o kullanıcının önbellekteki token'ları da düşsün
+users.on_invalidate(token_cache.invalidate_user)
+
+
+# 8b) TOKEN İPTAL LİSTESİ (REVOCATION)
+# JWT durumsuzdur: exp dolana kadar (30 dk) geçerlidir. Erken iptal için her token'a
+# benzersiz bir "jti" (JWT ID) eklenir ve iptal edilen jti'ler bir listede tutulur.
+# Her istekte listeye (ör. veritabanına) bakmak pahalı olacağı için önünde bir Bloom filtresi var:
+# - Bloom filtresi "kesinlikle yok" veya "belki var" der; "kesinlikle yok" cevabı ek sorgu gerektirmez.
+#   İsteklerin neredeyse tamamı iptal edilmemiş token'lardır → hepsi filtrede biter.
+# - "belki var" derse gerçek liste (_revoked) kontrol edilir (yanlış pozitifleri eler).
+# - Kayıtlar token'ın exp zamanında otomatik düşer; filtre silme desteklemediği için
+#   temizlikte kalan kayıtlardan yeniden kurulur.
+# Filtrenin boyutu capacity ve error_rate ile sabittir (100k kayıt / %0.1 → ~180 KB).
+
+class BloomFilter:
+    def __init__(self, capacity: int = 100_000, error_rate: float = 0.001):
+        # Optimum bit sayısı ve hash fonksiyonu sayısı
+        self.size = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, item: str):
+        # Tek bir özetten k farklı konum üretilir (double hashing)
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return ((h1 + i * h2) % self.size for i in range(self.hash_count))
+
+    def add(self, item: str):
+        for position in self._positions(item):
+            self.bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, item: str) -> bool:
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(item))
+
+
+class RevocationList:
+    def __init__(
+        self, capacity: int = 100_000, error_rate: float = 0.001, purge_interval: float = 60.0
+    ):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.purge_interval = purge_interval
+        self._filter = BloomFilter(capacity, error_rate)
+        self._revoked: dict[str, float] = {}  # jti → exp (gerçek liste)
+        self._next_purge = time.time() + purge_interval
+        self.filter_negatives = 0  # Filtrenin tek başına cevapladığı sorgular
+        self.exact_lookups = 0  # Gerçek listeye inilen sorgular
+
+    def revoke(self, jti: str, expires_at: float):
+        self._purge_expired()
+        if expires_at > time.time():  # Zaten süresi dolmuş token'ı saklamaya gerek yok
+            self._revoked[jti] = expires_at
+            self._filter.add(jti)
+
+    def is_revoked(self, jti: str) -> bool:
+        if jti not in self._filter:
+            self.filter_negatives += 1
+            return False
+        self.exact_lookups += 1
+        self._purge_expired()
+        expires_at = self._revoked.get(jti)
+        return expires_at is not None and expires_at > time.time()
+
+    def _purge_expired(self):
+        """Süresi dolan kayıtları siler ve filtreyi kalanlardan yeniden kurar."""
+        now = time.time()
+        if now < self._next_purge:
+            return
+        self._next_purge = now + self.purge_interval
+        self._revoked = {jti: exp for jti, exp in self._revoked.items() if exp > now}
+        self._filter = BloomFilter(self.capacity, self.error_rate)
+        for jti in self._revoked:
+            self._filter.add(jti)
+
+    def __len__(self) -> int:
+        return len(self._revoked)
+
+
+revocation_list = RevocationList(
+    capacity=int(os.getenv("REVOCATION_CAPACITY", "100000")),
+)
+
+
+# 9) TOKEN'I DOĞRULAYAN DEPENDENCY
 
 async def get_current_user(token: Annotated[str, Depends(oauth2_scheme)]):
     """
@@ -144,25 +670,41 @@ async def get_current_user(token: Annotated[str, Depends(oauth2_scheme)]):
         headers={"WWW-Authenticate": "Bearer"},
     )
 
+    # Önbellekte varsa HMAC ve model oluşturma atlanır.
+    # İptal kontrolü yine de yapılır (çoğunlukla sadece Bloom filtresi → çok ucuz).
+    cached = token_cache.get(token)
+    if cached is not None:
+        cached_user, jti = cached
+        if jti is not None and revocation_list.is_revoked(jti):
+            raise credentials_exception
+        return cached_user
+
     try:
         # JWT doğrula
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        payload = key_ring.verify(token)
         username = payload.get("sub")  # JWT'deki kullanıcı adı
         if username is None:
             raise credentials_exception
+        jti = payload.get("jti")  # Eski token'larda olmayabilir
+        if jti is not None and revocation_list.is_revoked(jti):
+            raise credentials_exception
 
     except InvalidTokenError:
         raise credentials_exception
 
-    user = get_user(fake_users_db, username)
+    generation = token_cache.generation()
+    user = users.get(username)
     if not user:
         raise credentials_exception
 
+    # Kayıt token'ın exp'inde, emekli anahtar reddedilmeye başlayınca ise daha erken düşer
+    token_cache.set(token, user, min(payload["exp"], key_ring.valid_until(token)), jti, generation)
+
     return user
 
 
 
-# 9) KULLANICI AKTİF Mİ?
+# 10) KULLANICI AKTİF Mİ?
 
 async def get_current_active_user(
     current_user: Annotated[User, Depends(get_current_user)],
@@ -174,14 +716,28 @@ async def get_current_active_user(
 
 
 
-# 10) LOGIN ENDPOINT — TOKEN ÜRETİR
+# 11) LOGIN ENDPOINT — TOKEN ÜRETİR
+
+# Kullanıcı adı ve IP başına deneme sınırı (LOGIN_RATE_LIMIT=false → kapalı, ör. benchmark için)
+login_limiter = (
+    LoginRateLimiter()
+    if os.getenv("LOGIN_RATE_LIMIT", "true").lower() == "true"
+    else None
+)
+
 
 @app.post("/token")
 async def login_for_access_token(
+    request: Request,
     form_data: Annotated[OAuth2PasswordRequestForm, Depends()],
 ) -> Token:
 
-    user = authenticate_user(fake_users_db, form_data.username, form_data.password)
+    # Sınır aşıldıysa 429 döner; Argon2 doğrulaması hiç çalışmaz
+    if login_limiter is not None:
+        login_limiter.check(form_data.username, request.client.host if request.client else None)
+
+    # Havuz doluysa burada 503 + Retry-After döner
+    user = await authenticate_user_async(users, form_data.username, form_data.password)
 
     if not user:
         raise HTTPException(
@@ -203,7 +759,7 @@ async def login_for_access_token(
 
 
 
-# 11) TOKEN İLE KULLANICI BİLGİSİ ALMA
+# 12) TOKEN İLE KULLANICI BİLGİSİ ALMA
 
 @app.get("/users/me", response_model=User)
 async def read_users_me(
@@ -213,10 +769,250 @@ async def read_users_me(
 
 
 
-# 12) ÖRNEK: SADECE TOKEN İLE ERİŞİLEBİLEN ENDPOINT
+# 13) ÖRNEK: SADECE TOKEN İLE ERİŞİLEBİLEN ENDPOINT
 
 @app.get("/users/me/items")
 async def read_own_items(
     current_user: Annotated[User, Depends(get_current_active_user)],
 ):
     return [{"item_id": "Item1", "owner": current_user.username}]
+
+
+
+# 13b) TOKEN İPTALİ (LOGOUT)
+# Gönderilen token'ın jti'si iptal listesine eklenir; exp dolunca kayıt kendiliğinden silinir.
+
+@app.post("/token/revoke")
+async def revoke_token(
+    token: Annotated[str, Depends(oauth2_scheme)],
+    current_user: Annotated[User, Depends(get_current_user)],
+):
+    payload = key_ring.verify(token)
+    if "jti" not in payload or "exp" not in payload:
+        raise HTTPException(status_code=400, detail="Bu token iptal edilemez (jti/exp yok).")
+    revocation_list.revoke(payload["jti"], payload["exp"])
+    token_cache.invalidate(token)
+    return {"revoked": True}
+
+
+
+# 14) BENCHMARK
+# Sadece "python fastapi_security_jwt.py" ile çalıştırıldığında devreye girer.
+
+def benchmark_users_me(requests: int = 5000):
+    """
+    /users/me isteğini önbellek açıkken ve kapalıyken ölçer.
+    Login bir kez yapılır, sonra aynı token ile art arda istek atılır.
+    TestClient'ın kendi maliyeti de ölçüme girdiği için get_current_user ayrıca ölçülür.
+    """
+    import asyncio
+
+    from fastapi.testclient import TestClient
+
+    client = TestClient(app)
+    token = client.post(
+        "/token", data={"username": "johndoe", "password": "secret"}
+    ).json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+
+    original_size = token_cache.maxsize
+    for label, size in (("önbellek kapalı", 0), ("önbellek açık  ", original_size or 10_000)):
+        token_cache.clear()
+        token_cache.maxsize = size
+        start = time.perf_counter()
+        for _ in range(requests):
+            client.get("/users/me", headers=headers)
+        elapsed = time.perf_counter() - start
+
+        async def verify_many():
+            for _ in range(requests):
+                await get_current_user(token)
+
+        start = time.perf_counter()
+        asyncio.run(verify_many())
+        verify_us = (time.perf_counter() - start) / requests * 1_000_000
+        print(f"{label}: {requests / elapsed:8.0f} istek/s  get_current_user: {verify_us:6.1f} µs")
+    token_cache.maxsize = original_size
+
+
+def benchmark_dependency_chain(calls: int = 20000):
+    """
+    get_current_user → get_current_active_user zincirinin istek başına maliyeti.
+    Token önbelleği kapatılır ki her çağrıda kullanıcı gerçekten okunsun;
+    kullanıcı önbelleği kapalıyken (her seferinde UserInDB) ve açıkken ölçülür.
+    """
+    import asyncio
+
+    token = create_access_token({"sub": "johndoe"}, timedelta(minutes=30))
+
+    async def chain():
+        for _ in range(calls):
+            await get_current_active_user(await get_current_user(token))
+
+    original_token_cache, original_ttl = token_cache.maxsize, users.ttl
+    token_cache.maxsize = 0
+    token_cache.clear()
+    for label, ttl in (("kullanıcı önbelleği kapalı", 0.0), ("kullanıcı önbelleği açık  ", 60.0)):
+        users.ttl = ttl
+        users.clear()
+        start = time.perf_counter()
+        asyncio.run(chain())
+        per_call_us = (time.perf_counter() - start) / calls * 1_000_000
+
+        start = time.perf_counter()
+        for _ in range(calls):
+            users.get("johndoe")
+        lookup_us = (time.perf_counter() - start) / calls * 1_000_000
+        print(f"{label}: zincir {per_call_us:6.1f} µs / istek, kullanıcı okuma {lookup_us:5.2f} µs")
+    token_cache.maxsize, users.ttl = original_token_cache, original_ttl
+
+
+def benchmark_login_storm(
+    logins: int = 200, login_concurrency: int = 16, probe_interval: float = 0.01, workers: int = 4
+):
+    """
+    Aynı anda çok sayıda login yapılırken /users/me gecikmesini (p50/p99) ölçer.
+    Uygulama uvicorn ile ayrı bir süreçte iki modda başlatılır:
+    - havuz yok (PASSWORD_POOL_WORKERS=0): Argon2 event loop üzerinde → /users/me login'leri bekler
+    - havuz var: Argon2 thread'lerde → /users/me gecikmesi düz kalır
+    Gerekli paketler: pip install uvicorn httpx
+    """
+    import subprocess
+    import sys
+
+    import httpx
+
+    login_form = {"username": "johndoe", "password": "secret"}
+
+    async def storm(base_url: str) -> tuple[float, float, int]:
+        async with httpx.AsyncClient(base_url=base_url, timeout=60) as client:
+            token = (await client.post("/token", data=login_form)).json()["access_token"]
+            headers = {"Authorization": f"Bearer {token}"}
+            remaining = iter(range(logins))
+            statuses: list[int] = []
+            latencies: list[float] = []
+            storm_done = asyncio.Event()
+
+            async def login_worker():
+                for _ in remaining:
+                    statuses.append((await client.post("/token", data=login_form)).status_code)
+
+            async def probe():
+                while not storm_done.is_set():
+                    start = time.perf_counter()
+                    await client.get("/users/me", headers=headers)
+                    latencies.append(time.perf_counter() - start)
+                    await asyncio.sleep(probe_interval)
+
+            probe_task = asyncio.create_task(probe())
+            await asyncio.gather(*(login_worker() for _ in range(login_concurrency)))
+            storm_done.set()
+            await probe_task
+
+        latencies.sort()
+        p50 = latencies[len(latencies) // 2] * 1000
+        p99 = latencies[max(int(len(latencies) * 0.99) - 1, 0)] * 1000
+        return p50, p99, statuses.count(503)
+
+    module_dir = os.path.dirname(os.path.abspath(__file__))
+    port = 8766
+    base_url = f"http://127.0.0.1:{port}"
+    for label, pool_workers in (("havuz yok", 0), (f"havuz ({workers} thread)", workers)):
+        server = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "fastapi_security_jwt:app", "--port", str(port),
+             "--log-level", "warning", "--app-dir", module_dir],
+            env={
+                **os.environ,
+                "PASSWORD_POOL_WORKERS": str(pool_workers),
+                "LOGIN_RATE_LIMIT": "false",  # Aynı kullanıcıyla yüzlerce login yapılıyor
+            },
+        )
+        try:
+            for _ in range(100):  # Sunucu açılana kadar bekle
+                try:
+                    httpx.get(f"{base_url}/docs")
+                    break
+                except httpx.TransportError:
+                    time.sleep(0.1)
+            p50, p99, rejected = asyncio.run(storm(base_url))
+        finally:
+            server.terminate()
+            server.wait()
+        print(f"{label:18s} /users/me p50: {p50:7.2f} ms  p99: {p99:7.2f} ms  503: {rejected}")
+
+
+def benchmark_jwt_algorithms(tokens: int = 2000):
+    """Her algoritma için saniyedeki imza ve doğrulama sayısını ölçer."""
+    payload = {"sub": "johndoe", "exp": datetime.now(timezone.utc) + timedelta(minutes=30)}
+    for algorithm in ("HS256", "RS256", "ES256", "EdDSA"):
+        ring = KeyRing(algorithm=algorithm)
+        ring.rotate()
+
+        start = time.perf_counter()
+        signed = [ring.sign(payload) for _ in range(tokens)]
+        sign_rate = tokens / (time.perf_counter() - start)
+
+        start = time.perf_counter()
+        for token in signed:
+            ring.verify(token)
+        verify_rate = tokens / (time.perf_counter() - start)
+        print(f"{algorithm:6s} imza: {sign_rate:8.0f}/s  doğrulama: {verify_rate:8.0f}/s")
+
+
+def calibrate_argon2(
+    target_ms: float = 50.0,
+    parallelism: int = 4,
+    max_memory_cost: int = 262144,
+    samples: int = 3,
+) -> dict:
+    """
+    Bu makinede verify süresini ölçerek hedef gecikmeyi aşmayan en güçlü ayarı bulur.
+    Bellek 8 MB'dan başlayıp ikiye katlanarak, her bellek için time_cost 1'den artırılarak denenir.
+    En güçlü = bellek x tur çarpımı en büyük olan ayar.
+    """
+    best = None
+    memory_cost = 8192
+    while memory_cost <= max_memory_cost:
+        for time_cost in range(1, 11):
+            hasher = Argon2Hasher(
+                time_cost=time_cost, memory_cost=memory_cost, parallelism=parallelism
+            )
+            hashed = hasher.hash("calibration-password")
+            timings = []
+            for _ in range(samples):
+                start = time.perf_counter()
+                hasher.verify("calibration-password", hashed)
+                timings.append((time.perf_counter() - start) * 1000)
+            median_ms = sorted(timings)[len(timings) // 2]
+            print(f"m={memory_cost:7d} t={time_cost:2d} p={parallelism}  {median_ms:8.1f} ms")
+            if median_ms > target_ms:
+                break  # Bu bellekte daha fazla tur da hedefi aşar
+            if best is None or memory_cost * time_cost >= best[0]:
+                params = {"time_cost": time_cost, "memory_cost": memory_cost, "parallelism": parallelism}
+                best = (memory_cost * time_cost, params, median_ms)
+        if time_cost == 1 and median_ms > target_ms:
+            break  # En hafif tur bile hedefi aşıyor → daha fazla bellek denemeye gerek yok
+        memory_cost *= 2
+
+    if best is None:
+        raise SystemExit(f"Hiçbir ayar {target_ms} ms hedefinin altında kalmadı.")
+    _, params, median_ms = best
+    print(f"\nSeçilen ayar ({median_ms:.1f} ms):")
+    for name, value in params.items():
+        print(f"ARGON2_{name.upper()}={value}")
+    return params
+
+
+# Kullanım:
+#   python fastapi_security_jwt.py                → benchmark'lar
+#   python fastapi_security_jwt.py calibrate 50   → 50 ms hedefi için Argon2 ayarı öner
+if __name__ == "__main__":
+    import sys
+
+    if sys.argv[1:2] == ["calibrate"]:
+        calibrate_argon2(target_ms=float(sys.argv[2]) if len(sys.argv) > 2 else 50.0)
+    else:
+        benchmark_users_me()
+        benchmark_dependency_chain()
+        benchmark_login_storm()
+        benchmark_jwt_algorithms()
@@ -4,10 +4,13 @@
 
 
 from typing import Annotated
-from fastapi import Depends, FastAPI, HTTPException, status
+from fastapi import Depends, FastAPI, HTTPException, Request, status
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from pydantic import BaseModel
 
+from rate_limiter import LoginRateLimiter  # Aynı klasördeki ortak katman
+from user_repository import DictUserStore, UserRepository  # Aynı klasördeki ortak katman
+
 # 1) SAHTE VERİTABANI
 
 fake_users_db = {
@@ -53,18 +56,18 @@ class UserInDB(User):
     hashed_password: str  # sadece DB'de bulunur
 
 
-# 5) Veritabanından kullanıcıyı alma fonksiyonu
-
-def get_user(db, username: str):
-    if username in db:
-        return UserInDB(**db[username])
+# 5) Veritabanından kullanıcıyı alma
+# Her istekte UserInDB(**db[username]) yapmak yerine doğrulanmış model önbellekte tutulur.
+# Kullanıcı değişirse (ör. pasif yapılırsa) users.set_disabled(...) ile güncellenmeli,
+# yoksa eski hali TTL dolana kadar kullanılmaya devam eder.
+users = UserRepository(DictUserStore(fake_users_db), UserInDB, ttl=60.0)
 
 
 # 6) Token çözme (fake)
 # Token olarak username gönderiyoruz, o yüzden username geri dönüyor
 
 def fake_decode_token(token: str):
-    return get_user(fake_users_db, token)
+    return users.get(token)
 
 
 # 7) Geçerli kullanıcıyı token üzerinden bul
@@ -96,15 +99,19 @@ async def get_current_active_user(
 
 # 9) /token — kullanıcı adı ve şifreyle giriş yapılır
 
+# Kullanıcı adı ve IP başına deneme sınırı → fazlası 429 + Retry-After
+login_limiter = LoginRateLimiter()
+
+
 @app.post("/token")
-async def login(form_data: Annotated[OAuth2PasswordRequestForm, Depends()]):
+async def login(request: Request, form_data: Annotated[OAuth2PasswordRequestForm, Depends()]):
+    login_limiter.check(form_data.username, request.client.host if request.client else None)
+
     # username DB’de var mı?
-    user_dict = fake_users_db.get(form_data.username)
-    if not user_dict:
+    user = users.get(form_data.username)
+    if not user:
         raise HTTPException(status_code=400, detail="Incorrect username or password")
 
-    user = UserInDB(**user_dict)
-
     # Parola hashleri eşleşiyor mu?
     hashed_password = fake_hash_password(form_data.password)
     if hashed_password != user.hashed_password:
@@ -0,0 +1,94 @@
+# LOGIN RATE LIMITER — /token için deneme sınırı (token bucket)
+# oauth2_password_flow_demo.py ve fastapi_security_jwt.py bu dosyayı kullanır.
+#
+# Neden?
+# /token sınırsız deneme kabul ederse hem parola tahmini (brute-force) kolaylaşır
+# hem de Argon2 gibi pahalı hash'ler yüzünden sunucu CPU'su kolayca tüketilir.
+# Kontrol, parola doğrulamasından ÖNCE yapılır → reddedilen istek hiç hash hesaplatmaz.
+#
+# Token bucket (jeton kovası):
+# - Her anahtarın (kullanıcı adı veya IP) bir kovası vardır, kova en fazla capacity jeton alır
+# - Her deneme 1 jeton harcar, kova saniyede refill_rate jeton dolar
+# - Jeton yoksa istek 429 ile reddedilir, Retry-After kaç saniye sonra jeton olacağını söyler
+# Anahtar başına sadece (jeton sayısı, son güncelleme zamanı) tutulur → O(1) bellek.
+
+import math
+import threading
+import time
+from collections import OrderedDict
+
+from fastapi import HTTPException, status
+
+
+# 1) BACKEND
+# Kovaların nerede tutulduğunu soyutlar. Her backend tek bir metot sağlar:
+#   take(key, capacity, refill_rate) → 0.0 (izin verildi) veya kaç saniye beklenmesi gerektiği
+# Birden fazla sunucu aynı limitleri paylaşacaksa (ör. Redis) aynı metodu atomik olarak
+# uygulayan bir backend yazıp LoginRateLimiter'a vermek yeterlidir.
+
+class InMemoryBucketBackend:
+    """
+    Süreç içi backend. max_keys dolunca en uzun süredir kullanılmayan anahtar atılır (LRU).
+    Atılan anahtar bir sonraki denemede dolu kova ile başlar; boşta kalan anahtarın kovası
+    zaten dolmuş olacağı için bu davranışı değiştirmez.
+    """
+
+    def __init__(self, max_keys: int = 100_000):
+        self.max_keys = max_keys
+        self._buckets: OrderedDict[str, tuple[float, float]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def take(self, key: str, capacity: float, refill_rate: float) -> float:
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated_at = self._buckets.get(key, (capacity, now))
+            tokens = min(capacity, tokens + (now - updated_at) * refill_rate)
+            if tokens >= 1:
+                tokens -= 1
+                retry_after = 0.0
+            else:
+                retry_after = (1 - tokens) / refill_rate
+            self._buckets[key] = (tokens, now)
+            self._buckets.move_to_end(key)
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        return retry_after
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+
+# 2) LIMITER
+
+class LoginRateLimiter:
+    """
+    per_user → (capacity, refill_rate): aynı kullanıcı adı için
+    per_ip → (capacity, refill_rate): aynı istemci IP'si için
+    Varsayılan: kullanıcı başına 5 deneme, sonra dakikada 1; IP başına 20 deneme, sonra saniyede 1.
+    """
+
+    def __init__(
+        self,
+        backend=None,
+        per_user: tuple[float, float] = (5, 1 / 60),
+        per_ip: tuple[float, float] = (20, 1.0),
+    ):
+        self.backend = backend or InMemoryBucketBackend()
+        self.per_user = per_user
+        self.per_ip = per_ip
+        self.rejected = 0
+
+    def check(self, username: str, client_ip: str | None):
+        """Limit aşıldıysa 429 + Retry-After fırlatır. Parola doğrulamasından önce çağrılmalı."""
+        retry_after = 0.0
+        if client_ip is not None:
+            retry_after = self.backend.take(f"ip:{client_ip}", *self.per_ip)
+        if not retry_after:
+            retry_after = self.backend.take(f"user:{username}", *self.per_user)
+        if retry_after:
+            self.rejected += 1
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="Çok fazla giriş denemesi, lütfen daha sonra tekrar deneyin.",
+                headers={"Retry-After": str(math.ceil(retry_after))},
+            )
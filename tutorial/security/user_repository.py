@@ -0,0 +1,147 @@
+# USER REPOSITORY — kullanıcı kayıtlarını önbellekli okuyan ortak katman
+# oauth2_password_flow_demo.py ve fastapi_security_jwt.py bu dosyayı kullanır.
+#
+# Neden?
+# get_user(db, username) her kimlik doğrulamalı istekte UserInDB(**db[username]) çalıştırır.
+# Kullanıcı kaydı neredeyse hiç değişmez ama her istekte Pydantic doğrulaması baştan yapılır.
+# Burada doğrulanmış model bir kez oluşturulur ve TTL süresince tekrar kullanılır.
+#
+# Yapı:
+# - Store (depo) → ham kaydı nereden okuyacağımızı bilir (dict, SQLModel tablosu ...)
+# - UserRepository → store'dan okur, modele çevirir, sonucu önbellekte tutar
+# - Kayıt değişince (disabled, şifre ...) update() ile yazılır → önbellek o kullanıcı için temizlenir
+
+import threading
+import time
+from collections import OrderedDict
+
+
+# 1) STORE'LAR
+# Her store iki metot sağlar:
+#   load(username) → dict veya None
+#   update(username, **fields) → alanları kalıcı olarak değiştirir
+
+class DictUserStore:
+    """Bellekteki sözlük (fake_users_db) üzerinde çalışan store."""
+
+    def __init__(self, data: dict[str, dict]):
+        self.data = data
+
+    def load(self, username: str) -> dict | None:
+        return self.data.get(username)
+
+    def update(self, username: str, **fields):
+        self.data[username].update(fields)
+
+
+class SQLModelUserStore:
+    """
+    SQLModel tablosu üzerinde çalışan store.
+    table → username alanı primary key olan bir SQLModel(table=True) sınıfı. Örnek:
+
+        class UserRow(SQLModel, table=True):
+            username: str = Field(primary_key=True)
+            email: str | None = None
+            full_name: str | None = None
+            disabled: bool | None = None
+            hashed_password: str
+
+        store = SQLModelUserStore(engine, UserRow)
+    """
+
+    def __init__(self, engine, table):
+        self.engine = engine
+        self.table = table
+
+    def load(self, username: str) -> dict | None:
+        from sqlmodel import Session
+
+        with Session(self.engine) as session:
+            row = session.get(self.table, username)
+            return row.model_dump() if row else None
+
+    def update(self, username: str, **fields):
+        from sqlmodel import Session
+
+        with Session(self.engine) as session:
+            row = session.get(self.table, username)
+            row.sqlmodel_update(fields)
+            session.add(row)
+            session.commit()
+
+
+# 2) REPOSITORY
+
+class UserRepository:
+    """
+    store → yukarıdaki store'lardan biri
+    model → kaydın dönüştürüleceği Pydantic modeli (ör. UserInDB)
+    ttl → doğrulanmış modelin kaç saniye önbellekte kalacağı (0 → önbellek kapalı)
+    maxsize → en fazla kaç kullanıcı tutulacağı (LRU)
+    """
+
+    def __init__(self, store, model, ttl: float = 60.0, maxsize: int = 10_000):
+        self.store = store
+        self.model = model
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._cache: OrderedDict[str, tuple[float, object]] = OrderedDict()
+        self._lock = threading.Lock()  # Şifre doğrulama thread havuzundan da çağrılır
+        # Her invalidate ile artar. get() store'dan okumadan önce değeri alır; okuma sürerken
+        # başka bir thread kullanıcıyı değiştirdiyse okunan eski kayıt önbelleğe yazılmaz.
+        self._generation = 0
+        self._listeners = []  # invalidate olduğunda haber verilecek fonksiyonlar
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, username: str):
+        """Kullanıcıyı model olarak döner, yoksa None."""
+        if self.ttl > 0:
+            with self._lock:
+                entry = self._cache.get(username)
+                if entry is not None and entry[0] > time.monotonic():
+                    self._cache.move_to_end(username)
+                    self.hits += 1
+                    return entry[1]
+                self.misses += 1
+                generation = self._generation
+
+        record = self.store.load(username)
+        if record is None:
+            return None
+        user = self.model(**record)
+
+        if self.ttl > 0:
+            with self._lock:
+                if generation != self._generation:
+                    return user  # Bu isteğe ver ama önbelleğe koyma
+                self._cache[username] = (time.monotonic() + self.ttl, user)
+                self._cache.move_to_end(username)
+                while len(self._cache) > self.maxsize:
+                    self._cache.popitem(last=False)
+        return user
+
+    def update(self, username: str, **fields):
+        """Kaydı store'da değiştirir ve önbelleği temizler."""
+        self.store.update(username, **fields)
+        self.invalidate(username)
+
+    def set_disabled(self, username: str, disabled: bool):
+        """Kullanıcıyı pasif/aktif yapar; eski hali bir sonraki istekte kullanılmaz."""
+        self.update(username, disabled=disabled)
+
+    def invalidate(self, username: str):
+        with self._lock:
+            self._cache.pop(username, None)
+            self._generation += 1
+        for listener in self._listeners:
+            listener(username)
+
+    def on_invalidate(self, listener):
+        """Başka önbellekler (ör. token önbelleği) de kullanıcı değişince temizlensin diye."""
+        self._listeners.append(listener)
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+            self._generation += 1
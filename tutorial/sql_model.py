@@ -1,9 +1,21 @@
 #SQLModel + FastAPI CRUD Uygulaması (Detaylı Açıklamalı)
 
 
-from typing import Annotated
-from fastapi import FastAPI, Depends, HTTPException, Query
+import base64
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Annotated, Literal
+from fastapi import APIRouter, FastAPI, Depends, HTTPException, Query, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from pydantic import TypeAdapter, ValidationError
+from sqlalchemy import event, insert, text, tuple_
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import QueuePool, StaticPool
 from sqlmodel import SQLModel, Field, Session, create_engine, select
+from sqlmodel.ext.asyncio.session import AsyncSession
 
 
 
@@ -42,14 +54,150 @@ class HeroUpdate(SQLModel): #HeroUpdate in miras aldığı sınafa ve diğerleri
     secret_name: str | None = None
 
 
+# Toplu ekleme (bulk) cevabı → sadece veritabanının verdiği id'ler döner
+class HeroBulkResult(SQLModel):
+    ids: list[int]
+
+
 
 # 2) VERİTABANI BAĞLANTISI
 
 # SQLite dosya yolu
 sqlite_url = "sqlite:///database.db" # -> Bulunduğun klasörde database.db adında bir SQLite veritabanı dosyası oluştur ve ona bağlan.
 
+# SQLite ayar profilleri (PRAGMA değerleri)
+# - journal_mode: "WAL" → okuyucular yazarı beklemez. "DELETE" → SQLite'ın varsayılanı (rollback journal)
+# - synchronous: "FULL" en güvenli, "NORMAL" WAL ile güvenli ve hızlı, "OFF" en hızlı ama elektrik kesintisinde risklidir
+# - mmap_size: dosyanın ne kadarının belleğe map'leneceği (byte)
+# - cache_size: negatif değer KiB demektir → -64000 ≈ 64 MB sayfa önbelleği
+# - busy_timeout: kilitli veritabanında hata vermeden önce kaç ms beklenecek
+SQLITE_PROFILES = {
+    "default": {  # Eski davranış, karşılaştırma için
+        "journal_mode": "DELETE",
+        "synchronous": "FULL",
+        "mmap_size": 0,
+        "cache_size": -2000,
+        "busy_timeout": 0,
+    },
+    "wal": {  # Önerilen profil
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "mmap_size": 256 * 1024 * 1024,
+        "cache_size": -64000,
+        "busy_timeout": 5000,
+    },
+    "fast": {  # Veri kaybı kabul edilebilen ortamlar (test, geçici veri)
+        "journal_mode": "WAL",
+        "synchronous": "OFF",
+        "mmap_size": 1024 * 1024 * 1024,
+        "cache_size": -256000,
+        "busy_timeout": 5000,
+    },
+}
+
+
+def register_sqlite_pragmas(
+    sync_engine,
+    in_memory: bool,
+    journal_mode: str,
+    synchronous: str,
+    mmap_size: int,
+    cache_size: int,
+    busy_timeout: int,
+):
+    """
+    PRAGMA'ları her yeni bağlantı açıldığında "connect" event'i ile uygular.
+    Async engine'de de aynı fonksiyon engine.sync_engine üzerinden kullanılır.
+    """
+    @event.listens_for(sync_engine, "connect")
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        if not in_memory:  # :memory: veritabanında WAL olmaz
+            cursor.execute(f"PRAGMA journal_mode={journal_mode}")
+        cursor.execute(f"PRAGMA synchronous={synchronous}")
+        cursor.execute(f"PRAGMA mmap_size={int(mmap_size)}")
+        cursor.execute(f"PRAGMA cache_size={int(cache_size)}")
+        cursor.execute(f"PRAGMA busy_timeout={int(busy_timeout)}")
+        cursor.close()
+
+
+def create_sqlite_engine(
+    url: str,
+    journal_mode: str = "WAL",
+    synchronous: str = "NORMAL",
+    mmap_size: int = 0,
+    cache_size: int = -2000,
+    busy_timeout: int = 5000,
+    pool_size: int = 10,
+    max_overflow: int = 20,
+    echo: bool = False,
+):
+    """
+    Ayarlanabilir SQLite engine'i üretir.
+    Havuz seçimi:
+    - Dosya tabanlı SQLite → QueuePool (bağlantılar tekrar kullanılır, PRAGMA'lar bir kez çalışır)
+    - :memory: → StaticPool (tek bağlantı, yoksa her bağlantı ayrı boş bir veritabanı görür)
+    """
+    in_memory = url in ("sqlite://", "sqlite:///:memory:")
+    pool_args = (
+        {"poolclass": StaticPool}
+        if in_memory
+        else {"poolclass": QueuePool, "pool_size": pool_size, "max_overflow": max_overflow}
+    )
+    sqlite_engine = create_engine(
+        url,
+        echo=echo,
+        connect_args={"check_same_thread": False},
+        **pool_args,
+    )
+    register_sqlite_pragmas(
+        sqlite_engine, in_memory, journal_mode, synchronous, mmap_size, cache_size, busy_timeout
+    )
+    return sqlite_engine
+
+
+def create_async_sqlite_engine(
+    url: str,
+    journal_mode: str = "WAL",
+    synchronous: str = "NORMAL",
+    mmap_size: int = 0,
+    cache_size: int = -2000,
+    busy_timeout: int = 5000,
+    pool_size: int = 10,
+    max_overflow: int = 20,
+    echo: bool = False,
+):
+    """
+    create_sqlite_engine'in async karşılığı (aiosqlite sürücüsü ile).
+    url "sqlite:///..." şeklinde verilebilir, sürücü kısmı burada eklenir.
+    Gerekli paket: pip install aiosqlite
+    """
+    async_url = url.replace("sqlite://", "sqlite+aiosqlite://", 1)
+    in_memory = url in ("sqlite://", "sqlite:///:memory:")
+    pool_args = (
+        {"poolclass": StaticPool}
+        if in_memory
+        else {"pool_size": pool_size, "max_overflow": max_overflow}  # AsyncAdaptedQueuePool
+    )
+    async_sqlite_engine = create_async_engine(async_url, echo=echo, **pool_args)
+    register_sqlite_pragmas(
+        async_sqlite_engine.sync_engine,
+        in_memory,
+        journal_mode,
+        synchronous,
+        mmap_size,
+        cache_size,
+        busy_timeout,
+    )
+    return async_sqlite_engine
+
+
+# Hangi profilin kullanılacağı ortam değişkeninden okunur:
+#   SQLITE_PROFILE=fast fastapi dev sql_model.py
+SQLITE_PROFILE = os.getenv("SQLITE_PROFILE", "wal")
+
 # Engine → veritabanı motoru
-engine = create_engine(sqlite_url, connect_args={"check_same_thread": False})
+engine = create_sqlite_engine(sqlite_url, **SQLITE_PROFILES[SQLITE_PROFILE])
 # engine = Veritabanı ile FastAPI/SQLModel arasındaki köprü.
 # connect_args={"check_same_thread": False} -> Merak etme, aynı veritabanı bağlantısını birden fazla thread kullanabilir. ama açık kalırsa hata verir. Bu ayar o hatayı engeller.
 
@@ -81,6 +229,117 @@ def get_session():
 SessionDep = Annotated[Session, Depends(get_session)]
 
 
+# Async session yolu
+# Sync endpoint'ler Starlette'in threadpool'unda çalışır, yoğun yükte bu havuz tavan olur.
+# USE_ASYNC_DB=true ile CRUD endpoint'leri async def + AsyncSession ile çalışır,
+# veritabanı beklenirken event loop diğer isteklere bakar.
+USE_ASYNC_DB = os.getenv("USE_ASYNC_DB", "false").lower() == "true"
+
+# aiosqlite sadece async mod açıksa gerekir
+async_engine = (
+    create_async_sqlite_engine(sqlite_url, **SQLITE_PROFILES[SQLITE_PROFILE])
+    if USE_ASYNC_DB
+    else None
+)
+# expire_on_commit=False → commit sonrası alanlara erişmek için tekrar sorgu atılmaz
+async_session_factory = (
+    async_sessionmaker(async_engine, class_=AsyncSession, expire_on_commit=False)
+    if async_engine is not None
+    else None
+)
+
+
+async def get_async_session():
+    """get_session'ın async karşılığı."""
+    async with async_session_factory() as session:
+        yield session
+
+
+AsyncSessionDep = Annotated[AsyncSession, Depends(get_async_session)]
+
+
+
+# 3b) HERO ÖNBELLEĞİ (READ-THROUGH CACHE)
+# Hero trafiğinin büyük kısmı küçük bir grup kaydın tekrar tekrar okunmasıdır.
+# GET /heroes/{hero_id} önce bu önbelleğe bakar; kayıt bulunursa veritabanına HİÇ gidilmez
+# (Session nesnesi oluşturulur ama bağlantıyı ilk sorguda alır).
+# - maxsize → en fazla kaç kayıt tutulacak (LRU: en uzun süre kullanılmayan atılır)
+# - ttl → kayıt kaç saniye geçerli (süre dolunca veritabanından tekrar okunur)
+# update/delete endpoint'leri ilgili kaydı önbellekten siler.
+# Okuma kilitsiz yapıldığı için her invalidate tek bir "nesil" sayacını artırır:
+# okuma başlarken alınan nesil, set anında değişmişse okunan satır eski olabilir → önbelleğe yazılmaz.
+# Sayaç kayıt başına değil ortaktır: ek bellek sabit kalır, bedeli başka bir kayıt güncellenirken
+# biten okumanın da önbelleğe yazılmamasıdır (bir sonraki okuma yazar).
+class HeroCache:
+    def __init__(self, maxsize: int = 1024, ttl: float = 60.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: OrderedDict[int, tuple[float, HeroPublic]] = OrderedDict()
+        self._lock = threading.Lock()  # Sync endpoint'ler farklı thread'lerden erişir
+        self._generation = 0  # Her invalidate / clear ile artar
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, hero_id: int) -> HeroPublic | None:
+        with self._lock:
+            entry = self._data.get(hero_id)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, hero = entry
+            if expires_at < time.monotonic():  # Süresi dolmuş
+                del self._data[hero_id]
+                self.misses += 1
+                return None
+            self._data.move_to_end(hero_id)  # En son kullanılan → sona
+            self.hits += 1
+            return hero
+
+    def generation(self) -> int:
+        """Veritabanından okumadan ÖNCE alınır ve set'e verilir."""
+        with self._lock:
+            return self._generation
+
+    def set(self, hero: HeroPublic, generation: int | None = None):
+        with self._lock:
+            if generation is not None and generation != self._generation:
+                return  # Okuma sürerken bir kayıt güncellendi/silindi → eski satırı geri koyma
+            self._data[hero.id] = (time.monotonic() + self.ttl, hero)
+            self._data.move_to_end(hero.id)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)  # En eski → çıkar
+                self.evictions += 1
+
+    def invalidate(self, hero_id: int):
+        with self._lock:
+            self._data.pop(hero_id, None)
+            self._generation += 1
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._generation += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+
+# Ayarlar ortam değişkeninden okunur (HERO_CACHE_SIZE=0 → önbellek kapalı)
+HERO_CACHE_SIZE = int(os.getenv("HERO_CACHE_SIZE", "1024"))
+HERO_CACHE_TTL = float(os.getenv("HERO_CACHE_TTL", "60"))
+
+hero_cache = HeroCache(maxsize=HERO_CACHE_SIZE, ttl=HERO_CACHE_TTL)
+
+
 
 # 4) FASTAPI UYGULAMASI
 
@@ -94,10 +353,15 @@ def on_startup():
 
 # 5) CRUD ENDPOINTLERİ
 
+# CRUD endpoint'leri iki router'da tanımlanır: sync (varsayılan) ve async.
+# Hangisinin uygulamaya ekleneceğine USE_ASYNC_DB karar verir (bkz. bölüm sonu).
+sync_router = APIRouter()
+async_router = APIRouter()
+
 # -----------------------
 # CREATE
 # -----------------------
-@app.post("/heroes/", response_model=HeroPublic) #response_model=HeroPublic → Response olarak HeroPublic dönecek
+@sync_router.post("/heroes/", response_model=HeroPublic) #response_model=HeroPublic → Response olarak HeroPublic dönecek
 def create_hero(hero: HeroCreate, session: SessionDep):
     """
     Kullanıcı HeroCreate modeline uygun JSON gönderir.
@@ -111,39 +375,360 @@ def create_hero(hero: HeroCreate, session: SessionDep):
     return db_hero  # API HeroPublic modeli döner (secret_name gizlenir)
 
 
+# -----------------------
+# BULK CREATE
+# -----------------------
+# Tek tek create_hero çağırmak her kayıt için commit + refresh yapar (2 tur + 1 fsync).
+# Burada kayıtlar parça parça (chunk) doğrulanır ve her parça tek bir executemany ile eklenir.
+# Tüm istek TEK transaction'dır → ya hepsi eklenir ya hiçbiri.
+BULK_CHUNK_SIZE = 1000  # Bir seferde doğrulanıp eklenecek kayıt sayısı
+
+# TypeAdapter bir kez oluşturulur, her istekte tekrar kurulmaz
+hero_create_list_adapter = TypeAdapter(list[HeroCreate])
+
+
+def insert_hero_chunk(session: Session, chunk: list[dict], start_index: int) -> list[int]:
+    """
+    Bir parça ham JSON kaydını doğrular ve tek executemany ile ekler.
+    start_index → hata mesajında kaydın istekteki gerçek sırasını göstermek için.
+    """
+    try:
+        heroes = hero_create_list_adapter.validate_python(chunk)
+    except ValidationError as exc:
+        errors = []
+        for error in exc.errors(include_url=False):
+            loc = list(error["loc"])
+            if loc and isinstance(loc[0], int):
+                loc[0] += start_index  # Parça içi sırayı istek içi sıraya çevir
+            errors.append({"loc": ["body", *loc], "msg": error["msg"], "type": error["type"]})
+        raise HTTPException(status_code=422, detail=errors)
+
+    rows = [hero.model_dump() for hero in heroes]
+    # RETURNING ile id'ler aynı sorgudan gelir → refresh gerekmez.
+    # sort_by_parameter_order=True → id'ler gönderilen sırayla döner.
+    statement = insert(Hero).returning(Hero.id, sort_by_parameter_order=True)
+    return list(session.connection().execute(statement, rows).scalars())
+
+
+async def iter_ndjson(request: Request):
+    """
+    NDJSON (her satırda bir JSON nesnesi) gövdesini akış halinde okur.
+    Tüm gövde RAM'e alınmaz, satırlar geldikçe üretilir.
+    """
+    buffer = b""
+    async for part in request.stream():
+        buffer += part
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            if line.strip():
+                yield line
+    if buffer.strip():
+        yield buffer
+
+
+@app.post("/heroes/bulk", response_model=HeroBulkResult)
+async def create_heroes_bulk(request: Request, session: SessionDep):
+    """
+    İki format kabul edilir:
+    - application/json → HeroCreate listesi (JSON array)
+    - application/x-ndjson → her satırda bir HeroCreate
+    Veritabanı işleri threadpool'da çalışır, event loop bloklanmaz.
+    """
+    ids: list[int] = []
+    chunk: list = []
+
+    async def flush():
+        start_index = len(ids)
+        ids.extend(await run_in_threadpool(insert_hero_chunk, session, chunk, start_index))
+        chunk.clear()
+
+    try:
+        content_type = request.headers.get("content-type", "")
+        if content_type.startswith(("application/x-ndjson", "application/jsonl")):
+            async for line in iter_ndjson(request):
+                chunk.append(json.loads(line))
+                if len(chunk) >= BULK_CHUNK_SIZE:
+                    await flush()
+        else:
+            data = json.loads(await request.body())
+            if not isinstance(data, list):
+                raise HTTPException(status_code=422, detail="Body must be a JSON array")
+            for start in range(0, len(data), BULK_CHUNK_SIZE):
+                chunk.extend(data[start:start + BULK_CHUNK_SIZE])
+                await flush()
+        if chunk:
+            await flush()
+    except json.JSONDecodeError:
+        session.rollback()
+        raise HTTPException(status_code=400, detail="Invalid JSON")
+    except HTTPException:
+        session.rollback()  # Hatalı bir parça varsa önceki parçalar da geri alınır
+        raise
+
+    await run_in_threadpool(session.commit)  # Tek commit → tek fsync
+    return HeroBulkResult(ids=ids)
+
+
 # -----------------------
 # READ ALL
 # -----------------------
-@app.get("/heroes/", response_model=list[HeroPublic])
+# Cursor (keyset) sayfalama için yardımcı fonksiyonlar.
+# offset ile sayfalamada SQLite, atlanan TÜM satırları okuyup çöpe atar → derin sayfalar yavaşlar.
+# Keyset sayfalamada "WHERE id > son_id" kullanılır → birincil anahtar index'i ile direkt doğru yere atlanır.
+# Cursor istemci için "opak" bir string'dir: içini bilmesine gerek yoktur, sadece geri gönderir.
+def encode_cursor(last_id: int) -> str:
+    """Son görülen id'yi URL'de taşınabilir opak bir string'e çevirir."""
+    raw = json.dumps({"last_id": last_id}).encode()
+    return base64.urlsafe_b64encode(raw).decode()
+
+
+def decode_cursor(cursor: str) -> int:
+    """encode_cursor'ın tersi. Bozuk cursor gelirse 400 döner."""
+    try:
+        last_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))["last_id"]
+    except (ValueError, KeyError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if not isinstance(last_id, int):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return last_id
+
+
+# Hızlı serileştirme yolu
+# Normalde FastAPI, dönen her ORM objesini response_model'e göre tek tek doğrular
+# ve jsonable_encoder'dan geçirir; 100 satırlık sayfalarda CPU'nun çoğu buraya gider.
+# Burada:
+# - Sadece HeroPublic'in ihtiyaç duyduğu kolonlar seçilir (ORM objesi oluşturulmaz, secret_name okunmaz)
+# - list[HeroPublic] için TypeAdapter BİR KEZ kurulur ve satırlar doğrudan JSON byte'larına çevrilir
+# - Hazır JSON Response döndüğü için FastAPI response_model işlemini tekrar yapmaz
+HERO_PUBLIC_COLUMNS = (Hero.id, Hero.name, Hero.age)
+hero_public_list_adapter = TypeAdapter(list[HeroPublic])
+
+
+# Seyrek alan seçimi (sparse fieldsets)
+# ?fields=name,age → sadece istenen kolonlar SELECT edilir ve döndürülür.
+# Sadece HeroPublic alanları istenebilir; secret_name hiçbir şekilde okunamaz.
+# id her zaman eklenir (cursor için gerekli).
+def parse_hero_fields(fields: str | None) -> tuple[str, ...] | None:
+    """"name,age" → ("id", "name", "age"). fields verilmezse None (tüm public alanlar)."""
+    if fields is None:
+        return None
+    requested = [name.strip() for name in fields.split(",") if name.strip()]
+    unknown = [name for name in requested if name not in HeroPublic.model_fields]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+    return ("id", *(name for name in HeroPublic.model_fields if name in requested and name != "id"))
+
+
+def heroes_page_statement(
+    offset: int, limit: int, cursor: str | None, field_names: tuple[str, ...] | None = None
+):
+    """Sayfa sorgusunu kurar (sync ve async endpoint'ler ortak kullanır)."""
+    columns = (
+        HERO_PUBLIC_COLUMNS
+        if field_names is None
+        else tuple(getattr(Hero, name) for name in field_names)
+    )
+    statement = select(*columns).order_by(Hero.id)  # Sabit sıralama → sayfalar kaymaz
+
+    if cursor is not None:
+        statement = statement.where(Hero.id > decode_cursor(cursor))
+    else:
+        statement = statement.offset(offset)
+
+    return statement.limit(limit)
+
+
+def heroes_json_response(
+    rows: list, limit: int, sparse: bool = False, make_cursor=None
+) -> Response:
+    """
+    Satırları tek seferde JSON'a çevirir.
+    sparse=True → satırlar HeroPublic'in tüm alanlarını içermez, doğrudan dict olarak yazılır.
+    Sayfa doluysa devamı olabilir → bir sonraki sayfanın cursor'ını header'a yazar.
+    make_cursor → son satırdan cursor üreten fonksiyon (varsayılan: sadece id)
+    """
+    if sparse:
+        content = json.dumps([row._asdict() for row in rows]).encode()
+    else:
+        heroes = hero_public_list_adapter.validate_python(rows, from_attributes=True)
+        content = hero_public_list_adapter.dump_json(heroes)
+    response = Response(content=content, media_type="application/json")
+    if limit and len(rows) == limit:
+        response.headers["X-Next-Cursor"] = (make_cursor or encode_cursor_for_row)(rows[-1])
+    return response
+
+
+def encode_cursor_for_row(row) -> str:
+    return encode_cursor(row.id)
+
+
+@sync_router.get("/heroes/", response_model=list[HeroPublic])
 def read_heroes(
     session: SessionDep, #SessionDep bu bir kısalmadır aslında Session = Depends(get_session)
-    offset: int = 0,  # Atlanacak kayıt sayısı
-    limit: Annotated[int, Query(le=100)] = 100  # En fazla 100 kayıt getir
+    offset: int = 0,  # Atlanacak kayıt sayısı (eski yöntem, geriye uyumluluk için duruyor)
+    limit: Annotated[int, Query(le=100)] = 100,  # En fazla 100 kayıt getir
+    cursor: str | None = None,  # Verilirse keyset sayfalama yapılır, offset yok sayılır
+    fields: str | None = None,  # Örn. "name,age" → sadece bu alanlar döner
 ):
-    heroes = session.exec( # -> session.exec(...): Bu SQL sorgusunu veritabanında çalıştırır.
-        select(Hero).offset(offset).limit(limit)
+    """
+    İki sayfalama modu vardır:
+    - offset/limit → eski davranış, derin sayfalarda yavaşlar.
+    - cursor → bir önceki cevabın X-Next-Cursor header'ındaki değer gönderilir,
+      sorgu "id > son_id" şeklinde çalışır ve her sayfa aynı hızda gelir.
+    Cevap gövdesi her iki modda da aynıdır (list[HeroPublic]).
+    """
+    field_names = parse_hero_fields(fields)
+    rows = session.exec( # -> session.exec(...): Bu SQL sorgusunu veritabanında çalıştırır.
+        heroes_page_statement(offset, limit, cursor, field_names)
     ).all()
 
-    return heroes
+    return heroes_json_response(rows, limit, sparse=field_names is not None)
+
+
+# -----------------------
+# SEARCH
+# -----------------------
+# HeroBase'de name ve age için index=True tanımlı. Bu endpoint sorguları o index'leri
+# kullanacak şekilde kurar:
+# - İsim ön eki LIKE 'abc%' yerine aralık olarak yazılır: name >= 'abc' AND name < 'abc\U0010ffff'
+#   (SQLite LIKE'ı büyük/küçük harf duyarsız olduğu için index kullanmaz; aralık kullanır.
+#   Bu yüzden ön ek araması büyük/küçük harfe duyarlıdır.)
+# - Yaş aralığı doğrudan ix_hero_age üzerinde çalışır.
+# - Sıralama (kolon, id) çifti üzerinden yapılır; index'ler satırı rowid ile birlikte
+#   tuttuğu için ayrıca sıralama gerekmez.
+# - Sayfalama keyset: (kolon, id) > (son_değer, son_id)
+# Yaşa göre sıralamada yaşı olmayan (NULL) kahramanlar sonuçlara dahil edilmez.
+HeroSearchSort = Literal["id", "name", "-name", "age", "-age"]
+PREFIX_UPPER_BOUND = "\U0010ffff"  # En büyük unicode karakter
+
+
+def encode_search_cursor(sort: str, row) -> str:
+    """Arama cursor'ı sıralama kolonunun son değerini de taşır."""
+    field = sort.lstrip("-")
+    raw = json.dumps({"sort": sort, "value": getattr(row, field), "last_id": row.id}).encode()
+    return base64.urlsafe_b64encode(raw).decode()
+
+
+def decode_search_cursor(cursor: str, sort: str):
+    """Cursor farklı bir sıralama için üretildiyse 400 döner."""
+    try:
+        data = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        value, last_id = data["value"], data["last_id"]
+    except (ValueError, KeyError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    # Değer sıralama kolonunun tipinde olmalı; yoksa sorgu veritabanında patlar (500)
+    value_type = str if sort.lstrip("-") == "name" else int
+    if (
+        data.get("sort") != sort
+        or type(last_id) is not int  # bool da int sayılır, kabul edilmez
+        or type(value) is not value_type
+    ):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return value, last_id
+
+
+def hero_search_statement(
+    name_prefix: str | None,
+    min_age: int | None,
+    max_age: int | None,
+    sort: str,
+    limit: int,
+    cursor: str | None,
+):
+    """Arama sorgusunu kurar (sync ve async endpoint'ler ortak kullanır)."""
+    field = sort.lstrip("-")
+    descending = sort.startswith("-")
+    sort_column = getattr(Hero, field)
+
+    statement = select(*HERO_PUBLIC_COLUMNS)
+    if name_prefix:
+        statement = statement.where(
+            Hero.name >= name_prefix, Hero.name < name_prefix + PREFIX_UPPER_BOUND
+        )
+    if min_age is not None:
+        statement = statement.where(Hero.age >= min_age)
+    if max_age is not None:
+        statement = statement.where(Hero.age <= max_age)
+    if field == "age":
+        statement = statement.where(Hero.age.is_not(None))
+
+    if cursor is not None:
+        value, last_id = decode_search_cursor(cursor, sort)
+        if field == "id":
+            key, last_key = Hero.id, last_id
+        else:
+            key, last_key = tuple_(sort_column, Hero.id), tuple_(value, last_id)
+        statement = statement.where(key < last_key if descending else key > last_key)
+
+    order = [sort_column] if field == "id" else [sort_column, Hero.id]
+    if descending:
+        order = [column.desc() for column in order]
+    return statement.order_by(*order).limit(limit)
+
+
+@sync_router.get("/heroes/search", response_model=list[HeroPublic])
+def search_heroes(
+    session: SessionDep,
+    name_prefix: str | None = None,  # İsim bununla başlamalı (büyük/küçük harf duyarlı)
+    min_age: int | None = None,
+    max_age: int | None = None,
+    sort: HeroSearchSort = "id",  # "-" ön eki → azalan sıralama
+    limit: Annotated[int, Query(le=100)] = 100,
+    cursor: str | None = None,  # Bir önceki cevabın X-Next-Cursor header'ı
+):
+    rows = session.exec(
+        hero_search_statement(name_prefix, min_age, max_age, sort, limit, cursor)
+    ).all()
+    return heroes_json_response(rows, limit, make_cursor=lambda row: encode_search_cursor(sort, row))
 
 
 # -----------------------
 # READ ONE
 # -----------------------
-@app.get("/heroes/{hero_id}", response_model=HeroPublic)
-def read_hero(hero_id: int, session: SessionDep):
-    hero = session.get(Hero, hero_id)
+# session.get(Hero, ...) tüm satırı (secret_name dahil) okur.
+# Public okumada sadece HeroPublic kolonları seçilir.
+def hero_public_statement(hero_id: int):
+    return select(*HERO_PUBLIC_COLUMNS).where(Hero.id == hero_id)
+
+
+def hero_public_response(hero_public: HeroPublic, field_names: tuple[str, ...] | None):
+    """fields verilmişse sadece o alanları içeren JSON döner."""
+    if field_names is None:
+        return hero_public
+    return Response(
+        content=hero_public.model_dump_json(include=set(field_names)),
+        media_type="application/json",
+    )
+
+
+@sync_router.get("/heroes/{hero_id}", response_model=HeroPublic)
+def read_hero(hero_id: int, session: SessionDep, fields: str | None = None):
+    field_names = parse_hero_fields(fields)
 
-    if not hero:  # Eğer ID bulunamazsa
+    # Session lazy'dir: önbellekte varsa hiç sorgu atılmaz, bağlantı da alınmaz
+    cached = hero_cache.get(hero_id)
+    if cached is not None:
+        return hero_public_response(cached, field_names)
+
+    generation = hero_cache.generation()
+    row = session.exec(hero_public_statement(hero_id)).first()
+
+    if not row:  # Eğer ID bulunamazsa
         raise HTTPException(status_code=404, detail="Hero not found")
 
-    return hero
+    # ORM objesi yerine HeroPublic saklanır → session kapansa da güvenle kullanılır.
+    # Önbellek tam HeroPublic tutar, alan seçimi cevap üretilirken yapılır.
+    hero_public = HeroPublic.model_validate(row, from_attributes=True)
+
+    if hero_cache.maxsize:
+        hero_cache.set(hero_public, generation)
+    return hero_public_response(hero_public, field_names)
 
 
 # -----------------------
 # UPDATE (PATCH)
 # -----------------------
-@app.patch("/heroes/{hero_id}", response_model=HeroPublic)
+@sync_router.patch("/heroes/{hero_id}", response_model=HeroPublic)
 def update_hero(hero_id: int, update: HeroUpdate, session: SessionDep):
     hero_db = session.get(Hero, hero_id)
 
@@ -159,6 +744,7 @@ def update_hero(hero_id: int, update: HeroUpdate, session: SessionDep):
 
     session.add(hero_db)
     session.commit()
+    hero_cache.invalidate(hero_id)  # Eski hali önbellekte kalmasın
     session.refresh(hero_db)
 
     return hero_db
@@ -167,7 +753,7 @@ def update_hero(hero_id: int, update: HeroUpdate, session: SessionDep):
 # -----------------------
 # DELETE
 # -----------------------
-@app.delete("/heroes/{hero_id}")
+@sync_router.delete("/heroes/{hero_id}")
 def delete_hero(hero_id: int, session: SessionDep):
     hero = session.get(Hero, hero_id)
 
@@ -176,5 +762,415 @@ def delete_hero(hero_id: int, session: SessionDep):
 
     session.delete(hero)
     session.commit()
+    hero_cache.invalidate(hero_id)
 
     return {"ok": True}
+
+
+# 5b) ASYNC CRUD ENDPOINTLERİ
+# Yukarıdakilerin birebir aynısı, sadece await ile AsyncSession kullanır.
+
+@async_router.post("/heroes/", response_model=HeroPublic)
+async def create_hero_async(hero: HeroCreate, session: AsyncSessionDep):
+    db_hero = Hero.model_validate(hero)
+    session.add(db_hero)
+    await session.commit()
+    await session.refresh(db_hero)
+    return db_hero
+
+
+@async_router.get("/heroes/", response_model=list[HeroPublic])
+async def read_heroes_async(
+    session: AsyncSessionDep,
+    offset: int = 0,
+    limit: Annotated[int, Query(le=100)] = 100,
+    cursor: str | None = None,
+    fields: str | None = None,
+):
+    field_names = parse_hero_fields(fields)
+    rows = (await session.exec(heroes_page_statement(offset, limit, cursor, field_names))).all()
+    return heroes_json_response(rows, limit, sparse=field_names is not None)
+
+
+@async_router.get("/heroes/search", response_model=list[HeroPublic])
+async def search_heroes_async(
+    session: AsyncSessionDep,
+    name_prefix: str | None = None,
+    min_age: int | None = None,
+    max_age: int | None = None,
+    sort: HeroSearchSort = "id",
+    limit: Annotated[int, Query(le=100)] = 100,
+    cursor: str | None = None,
+):
+    statement = hero_search_statement(name_prefix, min_age, max_age, sort, limit, cursor)
+    rows = (await session.exec(statement)).all()
+    return heroes_json_response(rows, limit, make_cursor=lambda row: encode_search_cursor(sort, row))
+
+
+@async_router.get("/heroes/{hero_id}", response_model=HeroPublic)
+async def read_hero_async(hero_id: int, session: AsyncSessionDep, fields: str | None = None):
+    field_names = parse_hero_fields(fields)
+
+    cached = hero_cache.get(hero_id)
+    if cached is not None:
+        return hero_public_response(cached, field_names)
+
+    generation = hero_cache.generation()
+    row = (await session.exec(hero_public_statement(hero_id))).first()
+    if not row:
+        raise HTTPException(status_code=404, detail="Hero not found")
+    hero_public = HeroPublic.model_validate(row, from_attributes=True)
+
+    if hero_cache.maxsize:
+        hero_cache.set(hero_public, generation)
+    return hero_public_response(hero_public, field_names)
+
+
+@async_router.patch("/heroes/{hero_id}", response_model=HeroPublic)
+async def update_hero_async(hero_id: int, update: HeroUpdate, session: AsyncSessionDep):
+    hero_db = await session.get(Hero, hero_id)
+    if not hero_db:
+        raise HTTPException(status_code=404, detail="Hero not found")
+    hero_db.sqlmodel_update(update.model_dump(exclude_unset=True))
+    session.add(hero_db)
+    await session.commit()
+    hero_cache.invalidate(hero_id)
+    await session.refresh(hero_db)
+    return hero_db
+
+
+@async_router.delete("/heroes/{hero_id}")
+async def delete_hero_async(hero_id: int, session: AsyncSessionDep):
+    hero = await session.get(Hero, hero_id)
+    if not hero:
+        raise HTTPException(status_code=404, detail="Hero not found")
+    await session.delete(hero)
+    await session.commit()
+    hero_cache.invalidate(hero_id)
+    return {"ok": True}
+
+
+# -----------------------
+# ÖNBELLEK İSTATİSTİKLERİ
+# -----------------------
+# /heroes/{hero_id} ile çakışmasın diye ayrı bir yol kullanılır
+@app.get("/heroes-cache/stats")
+def read_hero_cache_stats():
+    return hero_cache.stats()
+
+
+# Anahtar: hangi CRUD seti aktif olacak?
+#   USE_ASYNC_DB=true fastapi dev sql_model.py
+app.include_router(async_router if USE_ASYNC_DB else sync_router)
+
+
+
+# 6) BENCHMARK
+# Bu bölüm sadece "python sql_model.py" ile çalıştırıldığında devreye girer.
+# Geçici bir veritabanı oluşturup sorguları doğrudan engine üzerinden ölçer.
+
+def benchmark_pagination(total: int = 200_000, page_size: int = 100, page: int = 1000):
+    """
+    offset ile keyset sayfalamayı karşılaştırır.
+    page. sayfayı her iki yöntemle de getirir ve süreleri yazdırır.
+    offset süresi sayfa numarasıyla doğrusal artar, keyset süresi sabit kalır.
+    """
+    import tempfile
+
+    with tempfile.TemporaryDirectory() as tmp:
+        bench_engine = create_engine(f"sqlite:///{tmp}/bench.db")
+        SQLModel.metadata.create_all(bench_engine)
+
+        with Session(bench_engine) as session:
+            session.add_all(
+                Hero(name=f"Hero {i}", secret_name=f"Secret {i}", age=i % 90)
+                for i in range(total)
+            )
+            session.commit()
+
+            offset = page * page_size
+            # Keyset için bir önceki sayfanın son id'si (gerçekte istemci cursor ile taşır)
+            last_id = session.exec(
+                select(Hero.id).order_by(Hero.id).offset(offset - 1).limit(1)
+            ).one()
+
+            def measure(statement, repeat: int = 20) -> float:
+                start = time.perf_counter()
+                for _ in range(repeat):
+                    session.exec(statement).all()
+                return (time.perf_counter() - start) / repeat * 1000
+
+            offset_ms = measure(
+                select(Hero).order_by(Hero.id).offset(offset).limit(page_size)
+            )
+            keyset_ms = measure(
+                select(Hero).where(Hero.id > last_id).order_by(Hero.id).limit(page_size)
+            )
+            first_ms = measure(select(Hero).order_by(Hero.id).limit(page_size))
+
+        bench_engine.dispose()
+
+    print(f"Sayfa 1           : {first_ms:.3f} ms")
+    print(f"Sayfa {page} offset : {offset_ms:.3f} ms")
+    print(f"Sayfa {page} keyset : {keyset_ms:.3f} ms")
+
+
+def benchmark_engine_profiles(
+    duration: float = 3.0, readers: int = 8, writers: int = 2, rows: int = 10_000
+):
+    """
+    Her SQLite profili için karışık okuma/yazma yükü oluşturur.
+    readers kadar thread rastgele id ile okur, writers kadar thread sürekli ekleme yapar.
+    Sonunda her profil için saniyedeki okuma ve yazma sayısını yazdırır.
+    """
+    import random
+    import tempfile
+    import threading
+
+    for name, profile in SQLITE_PROFILES.items():
+        with tempfile.TemporaryDirectory() as tmp:
+            bench_engine = create_sqlite_engine(
+                f"sqlite:///{tmp}/bench.db", pool_size=readers + writers, **profile
+            )
+            SQLModel.metadata.create_all(bench_engine)
+            with Session(bench_engine) as session:
+                session.add_all(
+                    Hero(name=f"Hero {i}", secret_name=f"Secret {i}") for i in range(rows)
+                )
+                session.commit()
+
+            counts = {"read": 0, "write": 0, "error": 0}
+            lock = threading.Lock()
+            stop_at = time.perf_counter() + duration
+
+            def reader():
+                done = errors = 0
+                with Session(bench_engine) as session:
+                    while time.perf_counter() < stop_at:
+                        try:
+                            session.get(Hero, random.randint(1, rows))
+                            done += 1
+                        except Exception:  # "database is locked" → default profilde beklenir
+                            session.rollback()
+                            errors += 1
+                        session.expire_all()
+                with lock:
+                    counts["read"] += done
+                    counts["error"] += errors
+
+            def writer():
+                done = errors = 0
+                while time.perf_counter() < stop_at:
+                    try:
+                        with Session(bench_engine) as session:
+                            session.add(Hero(name="new", secret_name="new"))
+                            session.commit()
+                        done += 1
+                    except Exception:  # "database is locked" → default profilde beklenir
+                        errors += 1
+                with lock:
+                    counts["write"] += done
+                    counts["error"] += errors
+
+            threads = [threading.Thread(target=reader) for _ in range(readers)]
+            threads += [threading.Thread(target=writer) for _ in range(writers)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            bench_engine.dispose()
+
+        print(
+            f"{name:8s} okuma/s: {counts['read'] / duration:10.0f}  "
+            f"yazma/s: {counts['write'] / duration:8.0f}  hata: {counts['error']}"
+        )
+
+
+def benchmark_async_vs_sync(
+    concurrency_levels: tuple[int, ...] = (50, 200, 1000),
+    requests_per_level: int = 5000,
+    rows: int = 1000,
+):
+    """
+    Uygulamayı uvicorn ile iki modda (sync / async) ayrı süreçlerde başlatır,
+    GET /heroes/{id} üzerine farklı eşzamanlı istemci sayılarıyla yük verir.
+    Her seviye için saniyedeki istek sayısını ve p99 gecikmesini yazdırır.
+    Gerekli paketler: pip install uvicorn httpx aiosqlite
+    """
+    import asyncio
+    import random
+    import subprocess
+    import sys
+    import tempfile
+
+    import httpx
+
+    async def load(base_url: str, concurrency: int) -> tuple[float, float, int]:
+        latencies: list[float] = []
+        errors = 0
+        remaining = iter(range(requests_per_level))
+        limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+        async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client:
+
+            async def worker():
+                nonlocal errors
+                for _ in remaining:
+                    start = time.perf_counter()
+                    try:
+                        response = await client.get(f"/heroes/{random.randint(1, rows)}")
+                    except httpx.TransportError:  # Sunucu bağlantıyı kabul edemediyse
+                        errors += 1
+                        continue
+                    if response.status_code != 200:  # Örn. havuz tükendi → 500
+                        errors += 1
+                        continue
+                    latencies.append(time.perf_counter() - start)
+
+            start = time.perf_counter()
+            await asyncio.gather(*(worker() for _ in range(concurrency)))
+            elapsed = time.perf_counter() - start
+
+        latencies.sort()
+        p99 = latencies[max(int(len(latencies) * 0.99) - 1, 0)] * 1000 if latencies else 0.0
+        return len(latencies) / elapsed, p99, errors
+
+    module_dir = os.path.dirname(os.path.abspath(__file__))
+    for mode in ("false", "true"):
+        with tempfile.TemporaryDirectory() as tmp:
+            port = 8765
+            server = subprocess.Popen(
+                [sys.executable, "-m", "uvicorn", "sql_model:app", "--port", str(port),
+                 "--log-level", "warning", "--app-dir", module_dir],
+                cwd=tmp,  # database.db geçici klasörde oluşur
+                env={**os.environ, "USE_ASYNC_DB": mode},
+            )
+            base_url = f"http://127.0.0.1:{port}"
+            try:
+                for _ in range(100):  # Sunucu açılana kadar bekle
+                    try:
+                        httpx.get(f"{base_url}/heroes/?limit=1")
+                        break
+                    except httpx.TransportError:
+                        time.sleep(0.1)
+                httpx.post(
+                    f"{base_url}/heroes/bulk",
+                    json=[{"name": f"Hero {i}", "secret_name": "s"} for i in range(rows)],
+                )
+                for concurrency in concurrency_levels:
+                    rps, p99, errors = asyncio.run(load(base_url, concurrency))
+                    label = "async" if mode == "true" else "sync"
+                    print(
+                        f"{label:5s} c={concurrency:5d}  {rps:8.0f} istek/s  "
+                        f"p99: {p99:8.1f} ms  hata: {errors}"
+                    )
+            finally:
+                server.terminate()
+                server.wait()
+
+
+def benchmark_serialization(rows: int = 100, repeat: int = 500):
+    """
+    100 satırlık bir sayfanın sorgu + JSON'a çevirme maliyetini karşılaştırır:
+    - eski yol: select(Hero) → ORM objeleri → HeroPublic doğrulama → jsonable_encoder → json.dumps
+    - hızlı yol: kolon seçimi → tek TypeAdapter → JSON byte'ları
+    """
+    from fastapi.encoders import jsonable_encoder
+
+    bench_engine = create_sqlite_engine("sqlite://")
+    SQLModel.metadata.create_all(bench_engine)
+    with Session(bench_engine) as session:
+        session.add_all(
+            Hero(name=f"Hero {i}", secret_name=f"Secret {i}", age=i) for i in range(rows)
+        )
+        session.commit()
+
+        def old_path():
+            heroes = session.exec(select(Hero).order_by(Hero.id).limit(rows)).all()
+            validated = [HeroPublic.model_validate(hero) for hero in heroes]
+            session.expunge_all()  # Her turda ORM objeleri tekrar oluşturulsun
+            return json.dumps(jsonable_encoder(validated)).encode()
+
+        def fast_path():
+            result = session.exec(heroes_page_statement(0, rows, None)).all()
+            return heroes_json_response(result, rows).body
+
+        assert json.loads(old_path()) == json.loads(fast_path())  # Aynı çıktı
+
+        for label, func in (("eski yol ", old_path), ("hızlı yol", fast_path)):
+            start = time.perf_counter()
+            for _ in range(repeat):
+                func()
+            elapsed_us = (time.perf_counter() - start) / repeat * 1_000_000
+            print(f"{label}: {elapsed_us:8.1f} µs / sayfa")
+    bench_engine.dispose()
+
+
+def check_search_query_plans(rows: int = 1000):
+    """
+    Arama sorgularının EXPLAIN QUERY PLAN çıktısını kontrol eder.
+    Plan tam tablo taraması içeriyorsa ("SCAN hero", index olmadan) AssertionError fırlatır.
+    Yeni bir filtre/sıralama eklenince buraya da bir örnek eklenmeli.
+    """
+    cursor_row = Hero(id=500, name="Hero 500", age=20, secret_name="")
+    cases = {
+        "isim ön eki": dict(name_prefix="Hero 1"),
+        "isim ön eki + isim sırası": dict(name_prefix="Hero 1", sort="name"),
+        "isim ön eki + cursor": dict(
+            name_prefix="Hero 1", sort="name", cursor=encode_search_cursor("name", cursor_row)
+        ),
+        "yaş aralığı": dict(min_age=20, max_age=30),
+        "yaş aralığı + azalan yaş": dict(min_age=20, max_age=30, sort="-age"),
+        "yaş sırası + cursor": dict(sort="age", cursor=encode_search_cursor("age", cursor_row)),
+        "id cursor": dict(cursor=encode_search_cursor("id", cursor_row)),
+        "isim azalan + cursor": dict(sort="-name", cursor=encode_search_cursor("-name", cursor_row)),
+    }
+
+    check_engine = create_sqlite_engine("sqlite://")
+    SQLModel.metadata.create_all(check_engine)
+    with Session(check_engine) as session:
+        session.add_all(
+            Hero(name=f"Hero {i}", secret_name="s", age=i % 90) for i in range(rows)
+        )
+        session.commit()
+        session.exec(text("ANALYZE"))  # Planlayıcı için istatistik
+
+        failures = []
+        for label, params in cases.items():
+            params = {"name_prefix": None, "min_age": None, "max_age": None,
+                      "sort": "id", "limit": 100, "cursor": None, **params}
+            statement = hero_search_statement(**params)
+            sql = str(statement.compile(check_engine, compile_kwargs={"literal_binds": True}))
+            plan = [row[3] for row in session.exec(text(f"EXPLAIN QUERY PLAN {sql}"))]
+            full_scan = any(
+                step.startswith("SCAN hero") and "INDEX" not in step and "PRIMARY KEY" not in step
+                for step in plan
+            )
+            print(f"{'HATA' if full_scan else 'ok  '} {label:28s} {' | '.join(plan)}")
+            if full_scan:
+                failures.append(label)
+    check_engine.dispose()
+
+    assert not failures, f"Tam tablo taraması yapan sorgular: {failures}"
+
+
+# Kullanım:
+#   python sql_model.py            → tüm benchmark'lar
+#   python sql_model.py pagination → sadece sayfalama
+#   python sql_model.py profiles   → sadece SQLite profilleri
+#   python sql_model.py async      → sync / async yük testi
+#   python sql_model.py serialize  → sayfa serileştirme
+#   python sql_model.py explain    → arama sorgularının index kullanım kontrolü
+BENCHMARKS = {
+    "pagination": benchmark_pagination,
+    "profiles": benchmark_engine_profiles,
+    "async": benchmark_async_vs_sync,
+    "serialize": benchmark_serialization,
+    "explain": check_search_query_plans,
+}
+
+if __name__ == "__main__": # Dosya import edildiğinde benchmark çalışmaz
+    import sys
+
+    for bench_name in sys.argv[1:] or BENCHMARKS:
+        print(f"--- {bench_name} ---")
+        BENCHMARKS[bench_name]()
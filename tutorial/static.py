@@ -6,9 +6,13 @@ Amaç:
 - Yani /static/logo.png → static/logo.png dosyasını döner.
 """
 
+import os
 from fastapi import FastAPI
 from fastapi.staticfiles import StaticFiles
 
+from asset_compression import PrecompressedCache  # Önceden sıkıştırılmış gzip/br/zstd sürümleri
+from static_server import FastStaticFiles, HotFileCache  # Aynı klasördeki sendfile/ETag/Range destekli sunucu
+
 # FastAPI uygulamasını oluşturuyoruz
 app = FastAPI()
 
@@ -25,14 +29,74 @@ app = FastAPI()
 # Örnek:
 # /static/logo.png → static/logo.png dosyasını verir
 # /static/style.css → static/style.css dosyasını verir
+#
+# STATIC_SERVER=fast (varsayılan) → FastStaticFiles (bkz. static_server.py):
+#   sendfile/mmap ile gönderim, içerikten hesaplanan ETag, 304 ve Range (206) desteği
+# STATIC_SERVER=starlette → klasik StaticFiles (karşılaştırma için)
+# STATIC_PRECOMPRESS=true (varsayılan) → css/js/svg ... dosyaların gzip/br/zstd sürümleri açılışta
+#   arka planda üretilir ve Accept-Encoding'e göre sunulur (bkz. asset_compression.py)
+# STATIC_HOT_CACHE_BYTES → küçük dosyalar için RAM bütçesi (0 → kapalı)
+#   STATIC_HOT_FILE_MAX'tan küçük dosyalar header'larıyla birlikte RAM'den sunulur,
+#   STATIC_HOT_REVALIDATE saniyede bir değişip değişmedikleri kontrol edilir
 # ----------------------------------------------------------
+STATIC_DIR = os.getenv("STATIC_DIR", "static")
+STATIC_SERVER = os.getenv("STATIC_SERVER", "fast")
+STATIC_PRECOMPRESS = os.getenv("STATIC_PRECOMPRESS", "true").lower() == "true"
+STATIC_PRECOMPRESS_DIR = os.getenv("STATIC_PRECOMPRESS_DIR", ".static-compressed")
+
+STATIC_HOT_CACHE_BYTES = int(os.getenv("STATIC_HOT_CACHE_BYTES", str(64 * 1024 * 1024)))
+STATIC_HOT_FILE_MAX = int(os.getenv("STATIC_HOT_FILE_MAX", str(64 * 1024)))
+STATIC_HOT_REVALIDATE = float(os.getenv("STATIC_HOT_REVALIDATE", "1.0"))
+
+precompressed = PrecompressedCache(STATIC_PRECOMPRESS_DIR) if STATIC_PRECOMPRESS else None
+hot_cache = (
+    HotFileCache(
+        STATIC_HOT_CACHE_BYTES,
+        max_file_size=STATIC_HOT_FILE_MAX,
+        revalidate_interval=STATIC_HOT_REVALIDATE,
+    )
+    if STATIC_HOT_CACHE_BYTES > 0 and STATIC_SERVER != "starlette"
+    else None
+)
+
+if STATIC_SERVER == "starlette":
+    static_app = StaticFiles(directory=STATIC_DIR)
+else:
+    static_app = FastStaticFiles(
+        STATIC_DIR,
+        cache_control="public, max-age=3600",
+        precompressed=precompressed,
+        hot_cache=hot_cache,
+    )
+
 app.mount( # -> FastAPI uygulamasına mini bir uygulama ekler(app.mpunt)
     "/static",                  # kullanıcı buradan erişecek
-    StaticFiles(directory="static"),  # dosyaların bulunduğu klasör
+    static_app,  # dosyaların bulunduğu klasörü sunan mini uygulama
     name="static" #Bu sadece iç referans ismidir.
 )
 
 
+@app.on_event("startup")
+def warm_static_assets():
+    # Açılışı bekletmez: sıkıştırma ayrı bir thread'de yapılır
+    if precompressed is not None and isinstance(static_app, FastStaticFiles):
+        precompressed.warm(static_app)
+
+
+@app.on_event("shutdown")
+def stop_static_assets():
+    if precompressed is not None:
+        precompressed.close()
+
+
+@app.get("/static-stats")
+def static_stats():
+    return {
+        "precompressed": precompressed.stats() if precompressed is not None else None,
+        "hot_cache": hot_cache.stats() if hot_cache is not None else None,
+    }
+
+
 # ----------------------------------------------------------
 # NORMAL FASTAPI ENDPOINT
 # Bu endpoint sadece örnektir.
@@ -44,3 +108,224 @@ def home():
         "static_file_example": "http://localhost:8000/static/logo.png"
     }
 
+
+# ----------------------------------------------------------
+# BENCHMARK
+# "python static.py" → 1 KB, 1 MB ve 1 GB'lık dosyalar geçici bir klasöre yazılır,
+# uygulama uvicorn ile iki modda (starlette / fast) açılır ve saniyedeki istek / MiB ölçülür.
+# Gerekli paketler: pip install uvicorn httpx
+# ----------------------------------------------------------
+def benchmark_static(concurrency: int = 16):
+    import asyncio
+    import subprocess
+    import sys
+    import tempfile
+    import time
+
+    import httpx
+
+    # (dosya adı, boyut, istek sayısı)
+    cases = (("1kb.bin", 1024, 3000), ("1mb.bin", 1024**2, 500), ("1gb.bin", 1024**3, 4))
+
+    async def fetch_all(base_url: str, name: str, requests: int) -> int:
+        received = 0
+        remaining = iter(range(requests))
+        async with httpx.AsyncClient(base_url=base_url, timeout=600) as client:
+
+            async def worker():
+                nonlocal received
+                for _ in remaining:
+                    async with client.stream("GET", f"/static/{name}") as response:
+                        assert response.status_code == 200
+                        async for chunk in response.aiter_raw():
+                            received += len(chunk)
+
+            await asyncio.gather(*(worker() for _ in range(concurrency)))
+        return received
+
+    module_dir = os.path.dirname(os.path.abspath(__file__))
+    port = 8768
+    base_url = f"http://127.0.0.1:{port}"
+    with tempfile.TemporaryDirectory() as static_dir:
+        block = os.urandom(1024**2)
+        for name, size, _ in cases:
+            with open(os.path.join(static_dir, name), "wb") as f:
+                for offset in range(0, size, len(block)):
+                    f.write(block[: size - offset])
+
+        for mode in ("starlette", "fast"):
+            server = subprocess.Popen(
+                [sys.executable, "-m", "uvicorn", "static:app", "--port", str(port),
+                 "--log-level", "warning", "--app-dir", module_dir],
+                env={**os.environ, "STATIC_DIR": static_dir, "STATIC_SERVER": mode},
+            )
+            try:
+                for _ in range(100):  # Sunucu açılana kadar bekle
+                    try:
+                        httpx.get(f"{base_url}/")
+                        break
+                    except httpx.TransportError:
+                        time.sleep(0.1)
+                for name, size, requests in cases:
+                    asyncio.run(fetch_all(base_url, name, min(requests, concurrency)))  # Isınma (ETag hesabı)
+                    start = time.perf_counter()
+                    received = asyncio.run(fetch_all(base_url, name, requests))
+                    elapsed = time.perf_counter() - start
+                    assert received == size * requests
+                    print(f"{mode:9s} {name:8s} {requests / elapsed:8.1f} istek/sn  "
+                          f"{received / elapsed / 1024**2:8.1f} MiB/sn")
+            finally:
+                server.terminate()
+                server.wait()
+
+
+# ----------------------------------------------------------
+# SIKIŞTIRMA BENCHMARK'I
+# "python static.py compression" → aynı JS dosyası iki yoldan gzip'li istenir:
+# - StaticFiles + GZipMiddleware: her istekte yeniden sıkıştırma
+# - FastStaticFiles + PrecompressedCache: hazır .gz / .br / .zst dosyası
+# Uygulamalar ağ olmadan ASGI üzerinden çağrılır, istek başına süreç CPU'su (process_time) ölçülür.
+# ----------------------------------------------------------
+def benchmark_compression(requests: int = 300, size: int = 256 * 1024):
+    import asyncio
+    import tempfile
+    import time
+
+    from starlette.middleware.gzip import GZipMiddleware
+
+    async def fetch(target, accept_encoding: bytes) -> int:
+        scope = {
+            "type": "http", "asgi": {"version": "3.0", "spec_version": "2.4"}, "http_version": "1.1",
+            "method": "GET", "scheme": "http", "path": "/static/app.js", "raw_path": b"/static/app.js",
+            "root_path": "", "query_string": b"", "headers": [(b"accept-encoding", accept_encoding)],
+            "client": ("127.0.0.1", 50000), "server": ("127.0.0.1", 8000),
+        }
+        received = 0
+
+        async def receive():
+            return {"type": "http.request", "body": b"", "more_body": False}
+
+        async def send(message):
+            nonlocal received
+            if message["type"] == "http.response.body":
+                received += len(message.get("body", b""))
+
+        await target(scope, receive, send)
+        return received
+
+    async def measure(target, accept_encoding: bytes) -> tuple[float, int]:
+        await fetch(target, accept_encoding)  # Isınma
+        cpu_start = time.process_time()
+        for _ in range(requests):
+            body_size = await fetch(target, accept_encoding)
+        return (time.process_time() - cpu_start) / requests * 1000, body_size
+
+    with tempfile.TemporaryDirectory() as static_dir, tempfile.TemporaryDirectory() as cache_dir:
+        # Gerçekçi, tekrar eden ama birebir aynı olmayan JS içeriği
+        lines = [f"function handler{i}(event) {{ return render('item-{i % 97}', event.detail); }}\n"
+                 for i in range(size // 60)]
+        with open(os.path.join(static_dir, "app.js"), "w") as f:
+            f.write("".join(lines)[:size])
+
+        on_the_fly = FastAPI()
+        on_the_fly.mount("/static", StaticFiles(directory=static_dir))
+        on_the_fly.add_middleware(GZipMiddleware)
+
+        cache = PrecompressedCache(cache_dir)
+        fast_static = FastStaticFiles(static_dir, precompressed=cache)
+        cache.warm(fast_static)
+        cache.wait()
+        precompressed_app = FastAPI()
+        precompressed_app.mount("/static", fast_static)
+
+        cases = [("GZipMiddleware", on_the_fly, b"gzip")]
+        cases += [(f"önceden ({encoding})", precompressed_app, encoding.encode()) for encoding in cache.encodings]
+        for label, target, accept_encoding in cases:
+            cpu_ms, body_size = asyncio.run(measure(target, accept_encoding))
+            print(f"{label:18s} {cpu_ms:7.3f} ms CPU / istek   {size} → {body_size} byte")
+        cache.close()
+
+
+# ----------------------------------------------------------
+# SICAK DOSYA BENCHMARK'I
+# "python static.py hot" → 1000 eşzamanlı keep-alive bağlantı aynı küçük dosyayı ister.
+# httpx bu kadar bağlantıda ölçülen sunucudan daha çok CPU harcayacağı için
+# istemci, ham asyncio soketleriyle yazılmış minimal bir HTTP/1.1 istemcisidir.
+# Modlar: starlette StaticFiles / FastStaticFiles (önbelleksiz) / FastStaticFiles + HotFileCache
+# ----------------------------------------------------------
+def benchmark_hot_cache(clients: int = 1000, requests_per_client: int = 10, size: int = 4096):
+    import asyncio
+    import subprocess
+    import sys
+    import tempfile
+    import time
+
+    import httpx
+
+    request_bytes = b"GET /static/logo.png HTTP/1.1\r\nHost: localhost\r\n\r\n"
+
+    async def client(port: int, start_event: asyncio.Event) -> int:
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        await start_event.wait()
+        done = 0
+        for _ in range(requests_per_client):
+            writer.write(request_bytes)
+            head = await reader.readuntil(b"\r\n\r\n")
+            assert head.startswith(b"HTTP/1.1 200")
+            length = int(head.lower().split(b"content-length:")[1].split(b"\r\n")[0])
+            await reader.readexactly(length)
+            done += 1
+        writer.close()
+        return done
+
+    async def run(port: int) -> float:
+        start_event = asyncio.Event()
+        tasks = [asyncio.create_task(client(port, start_event)) for _ in range(clients)]
+        await asyncio.sleep(0.5)  # Tüm bağlantılar açılsın
+        start = time.perf_counter()
+        start_event.set()
+        total = sum(await asyncio.gather(*tasks))
+        return total / (time.perf_counter() - start)
+
+    module_dir = os.path.dirname(os.path.abspath(__file__))
+    port = 8769
+    with tempfile.TemporaryDirectory() as static_dir:
+        with open(os.path.join(static_dir, "logo.png"), "wb") as f:
+            f.write(os.urandom(size))
+
+        modes = (
+            ("starlette", {"STATIC_SERVER": "starlette"}),
+            ("fast", {"STATIC_SERVER": "fast", "STATIC_HOT_CACHE_BYTES": "0"}),
+            ("fast + hot cache", {"STATIC_SERVER": "fast"}),
+        )
+        for label, env in modes:
+            server = subprocess.Popen(
+                [sys.executable, "-m", "uvicorn", "static:app", "--port", str(port),
+                 "--log-level", "warning", "--backlog", str(clients * 2), "--app-dir", module_dir],
+                env={**os.environ, "STATIC_DIR": static_dir, "STATIC_PRECOMPRESS": "false", **env},
+            )
+            try:
+                for _ in range(100):  # Sunucu açılana kadar bekle
+                    try:
+                        httpx.get(f"http://127.0.0.1:{port}/")
+                        break
+                    except httpx.TransportError:
+                        time.sleep(0.1)
+                rps = asyncio.run(run(port))
+                stats = httpx.get(f"http://127.0.0.1:{port}/static-stats").json()["hot_cache"]
+            finally:
+                server.terminate()
+                server.wait()
+            extra = f"  (hit: {stats['hits']}, miss: {stats['misses']})" if stats else ""
+            print(f"{label:17s} {rps:8.0f} istek/sn  {clients} bağlantı{extra}")
+
+
+if __name__ == "__main__":
+    import sys
+
+    if sys.argv[1:] == ["compression"]:
+        benchmark_compression()
+    elif sys.argv[1:] == ["hot"]:
+        benchmark_hot_cache()
+    else:
+        benchmark_static()
@@ -0,0 +1,443 @@
+# STATIC SERVER — sendfile / mmap, ETag ve Range destekli statik dosya sunucusu
+# static.py bu dosyayı kullanır.
+#
+# Neden?
+# StaticFiles her istekte dosyayı thread havuzunda 64 KiB'lık read() çağrılarıyla okur,
+# her parçayı Python'a kopyalar ve sunucuya verir. Büyük dosyada yüzlerce syscall + kopya demektir.
+#
+# Burada:
+# - Sunucu ASGI "http.response.zerocopy" eklentisini sunuyorsa açık dosya sunucuya verilir,
+#   sunucu os.sendfile ile kernel içinde doğrudan sokete kopyalar (Range dahil)
+# - Sadece "http.response.pathsend" varsa tam dosya cevapları için dosya yolu verilir
+# - İkisi de yoksa dosya mmap ile belleğe eşlenir ve parça parça gönderilir (read() syscall'ı yok)
+# - Güçlü (strong) ETag içerikten hesaplanır ve (inode, mtime, size) anahtarıyla önbelleklenir
+#   → dosya değişmedikçe bir daha hesaplanmaz
+# - If-None-Match / If-Modified-Since → 304, Range: bytes=... → 206, If-Range desteklenir
+# - precompressed verilirse gzip/br/zstd sürümleri Accept-Encoding'e göre sunulur (bkz. asset_compression.py)
+# - hot_cache verilirse küçük dosyalar header'larıyla birlikte RAM'den sunulur (bkz. HotFileCache)
+
+import hashlib
+import mimetypes
+import mmap
+import os
+import stat
+import time
+from collections import OrderedDict
+from email.utils import formatdate, parsedate_to_datetime
+
+from starlette.concurrency import run_in_threadpool
+
+
+class StaticEntry:
+    """Bir dosya sürümü için istekten isteğe değişmeyen bilgiler."""
+
+    __slots__ = ("path", "size", "mtime", "version", "etag", "last_modified", "content_type", "headers")
+
+    def __init__(self, path: str, stat_result: os.stat_result, etag: str):
+        self.path = path
+        self.size = stat_result.st_size
+        self.mtime = stat_result.st_mtime
+        self.version = (stat_result.st_ino, stat_result.st_mtime_ns, stat_result.st_size)
+        self.etag = etag
+        self.last_modified = formatdate(stat_result.st_mtime, usegmt=True)
+        self.content_type = mimetypes.guess_type(path)[0] or "application/octet-stream"
+        self.headers: list[tuple[bytes, bytes]] = []  # Ek header'lar (content-encoding, vary ...)
+
+    def variant(self, path: str, size: int, etag: str, headers: list[tuple[bytes, bytes]]) -> "StaticEntry":
+        """Aynı dosyanın başka bir gösterimi (ör. sıkıştırılmış hali): tarih ve tür aynı kalır."""
+        entry = object.__new__(StaticEntry)
+        entry.path, entry.size, entry.etag, entry.headers = path, size, etag, headers
+        entry.mtime, entry.last_modified, entry.content_type = self.mtime, self.last_modified, self.content_type
+        entry.version = self.version
+        return entry
+
+
+def etag_matches(header: str, etag: str) -> bool:
+    """If-None-Match karşılaştırması (weak comparison: W/"x" ile "x" eşit sayılır)."""
+    if header.strip() == "*":
+        return True
+    return any(tag.strip().removeprefix("W/") == etag for tag in header.split(","))
+
+
+def parse_range(header: str, size: int) -> tuple[int, int] | None:
+    """
+    "bytes=a-b", "bytes=a-", "bytes=-n" → (start, end) [end dahil değil].
+    Anlaşılmayan veya çok parçalı Range → None (tüm dosya 200 ile gönderilir, RFC buna izin verir).
+    Karşılanamayan aralık → ValueError (416).
+    """
+    unit, _, spec = header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in spec:
+        return None
+    first, dash, last = spec.strip().partition("-")
+    if not dash:
+        return None
+    try:
+        if first:
+            start = int(first)
+            end = int(last) + 1 if last else size
+        else:
+            start, end = max(size - int(last), 0), size  # Son n byte
+    except ValueError:
+        return None
+    end = min(end, size)
+    if start >= end:
+        raise ValueError("Range karşılanamıyor")
+    return start, end
+
+
+class FastStaticFiles:
+    """
+    StaticFiles gibi app.mount ile bağlanan saf ASGI uygulaması.
+    directory → sunulacak klasör (yoksa istekler 404 döner, uygulama açılışta çökmez)
+    chunk_size → mmap yolunda her send() ile gönderilen parça
+    etag_hash_limit → bu boyuttan büyük dosyalarda ETag içerikten değil (inode, mtime, size)'dan türetilir
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        *,
+        chunk_size: int = 256 * 1024,
+        cache_control: str | None = None,
+        etag_hash_limit: int = 64 * 1024 * 1024,
+        max_etags: int = 10_000,
+        precompressed=None,
+        hot_cache=None,
+    ):
+        self.directory = os.path.realpath(directory)
+        self.precompressed = precompressed
+        self.hot_cache = hot_cache
+        self.chunk_size = chunk_size
+        self.cache_control = cache_control
+        self.etag_hash_limit = etag_hash_limit
+        self.max_etags = max_etags
+        self._etags: dict[tuple[int, int, int], str] = {}
+
+    # 1) DOSYAYI BULMA
+
+    @staticmethod
+    def route_path(scope) -> str:
+        path, root_path = scope["path"], scope.get("root_path", "")
+        if root_path and path.startswith(root_path):
+            path = path[len(root_path):]  # Mount: /static/css/a.css → /css/a.css
+        return path
+
+    def resolve(self, route_path: str) -> str | None:
+        """URL'deki yolu klasör içindeki gerçek dosya yoluna çevirir; klasör dışına çıkılamaz."""
+        try:
+            full_path = os.path.realpath(os.path.join(self.directory, route_path.lstrip("/")))
+        except ValueError:
+            return None  # /static/a%00b → "embedded null byte"
+        if os.path.commonpath([full_path, self.directory]) != self.directory:
+            return None  # /static/../../etc/passwd
+        return full_path
+
+    def _compute_etag(self, full_path: str, stat_result: os.stat_result) -> str:
+        if stat_result.st_size > self.etag_hash_limit:
+            return f'"{stat_result.st_ino:x}-{stat_result.st_mtime_ns:x}-{stat_result.st_size:x}"'
+        hasher = hashlib.sha256()
+        with open(full_path, "rb") as f:
+            while data := f.read(1024 * 1024):
+                hasher.update(data)
+        return f'"{hasher.hexdigest()[:32]}"'
+
+    def load_entry(self, full_path: str) -> StaticEntry | None:
+        """Thread havuzunda çalışır: stat + (gerekirse) ETag hesabı."""
+        try:
+            stat_result = os.stat(full_path)
+        except (FileNotFoundError, NotADirectoryError, PermissionError):
+            return None
+        if not stat.S_ISREG(stat_result.st_mode):
+            return None
+        key = (stat_result.st_ino, stat_result.st_mtime_ns, stat_result.st_size)
+        etag = self._etags.get(key)
+        if etag is None:
+            try:
+                etag = self._compute_etag(full_path, stat_result)
+            except (FileNotFoundError, PermissionError):
+                return None  # Okunamayan dosya 500 değil 404
+            if len(self._etags) >= self.max_etags:
+                self._etags.clear()
+            self._etags[key] = etag
+        return StaticEntry(full_path, stat_result, etag)
+
+    # 2) ASGI GİRİŞİ
+
+    async def __call__(self, scope, receive, send):
+        assert scope["type"] == "http"
+        if scope["method"] not in ("GET", "HEAD"):
+            await self.send_empty(send, 405, [(b"allow", b"GET, HEAD")])
+            return
+        route_path = self.route_path(scope)
+
+        # Sıcak dosya: realpath + stat + ETag hesabı atlanır
+        hot = self.hot_cache.lookup(route_path) if self.hot_cache is not None else None
+        if hot is not None:
+            entry = hot.entry
+        else:
+            full_path = self.resolve(route_path)
+            entry = await run_in_threadpool(self.load_entry, full_path) if full_path else None
+            if entry is None:
+                await self.send_empty(send, 404)
+                return
+            if self.hot_cache is not None:
+                hot = self.hot_cache.store(route_path, entry)
+
+        if self.precompressed is not None:
+            entry = self.precompressed.select(entry, scope)
+        await self.send_entry(scope, send, entry, hot)
+
+    # 3) CEVAP
+
+    def base_headers(self, entry: StaticEntry) -> list[tuple[bytes, bytes]]:
+        headers = [
+            (b"etag", entry.etag.encode()),
+            (b"last-modified", entry.last_modified.encode()),
+            (b"accept-ranges", b"bytes"),
+            *entry.headers,
+        ]
+        if self.cache_control:
+            headers.append((b"cache-control", self.cache_control.encode()))
+        return headers
+
+    def not_modified(self, request_headers: dict[bytes, bytes], entry: StaticEntry) -> bool:
+        if_none_match = request_headers.get(b"if-none-match")
+        if if_none_match is not None:  # Varsa If-Modified-Since'e bakılmaz (RFC 9110)
+            return etag_matches(if_none_match.decode("latin-1"), entry.etag)
+        if_modified_since = request_headers.get(b"if-modified-since")
+        if if_modified_since is not None:
+            try:
+                since = parsedate_to_datetime(if_modified_since.decode("latin-1")).timestamp()
+            except (TypeError, ValueError):
+                return False
+            return int(entry.mtime) <= since
+        return False
+
+    def response_headers(self, entry: StaticEntry) -> list[tuple[bytes, bytes]]:
+        """Tam (200) cevabın header'ları."""
+        return self.base_headers(entry) + [
+            (b"content-type", entry.content_type.encode()),
+            (b"content-length", str(entry.size).encode()),
+        ]
+
+    async def send_entry(self, scope, send, entry: StaticEntry, hot=None):
+        request_headers = dict(scope["headers"])
+        headers = self.base_headers(entry)
+
+        if self.not_modified(request_headers, entry):
+            await self.send_empty(send, 304, headers)
+            return
+
+        start, end, status_code = 0, entry.size, 200
+        range_header = request_headers.get(b"range")
+        if_range = request_headers.get(b"if-range")
+        # If-Range: istemcideki kopya hâlâ aynıysa parça, değilse tüm dosya
+        if range_header is not None and (if_range is None or if_range.decode("latin-1") == entry.etag):
+            try:
+                byte_range = parse_range(range_header.decode("latin-1"), entry.size)
+            except ValueError:
+                await self.send_empty(send, 416, [(b"content-range", f"bytes */{entry.size}".encode())])
+                return
+            if byte_range is not None:
+                start, end = byte_range
+                status_code = 206
+                headers.append((b"content-range", f"bytes {start}-{end - 1}/{entry.size}".encode()))
+
+        if status_code == 200 and hot is not None and scope["method"] == "GET":
+            cached = await self.hot_cache.response(hot, entry, self)
+            if cached is not None:
+                cached_headers, body = cached  # Header'lar da hazır: sadece iki send()
+                await send({"type": "http.response.start", "status": 200, "headers": cached_headers})
+                await send({"type": "http.response.body", "body": body, "more_body": False})
+                return
+
+        headers += [
+            (b"content-type", entry.content_type.encode()),
+            (b"content-length", str(end - start).encode()),
+        ]
+        await send({"type": "http.response.start", "status": status_code, "headers": headers})
+        if scope["method"] == "HEAD" or start == end:
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+            return
+        await self.send_file_body(scope, send, entry.path, start, end, status_code == 200)
+
+    async def send_file_body(self, scope, send, path: str, start: int, end: int, whole_file: bool):
+        extensions = scope.get("extensions") or {}
+
+        if "http.response.zerocopy" in extensions:
+            # Sunucu dosya tanıtıcısını alıp os.sendfile(socket, file, offset, count) çağırır
+            file = await run_in_threadpool(open, path, "rb")
+            try:
+                await send({
+                    "type": "http.response.zerocopy",
+                    "file": file,
+                    "offset": start,
+                    "count": end - start,
+                    "more_body": False,
+                })
+            finally:
+                file.close()
+            return
+
+        if whole_file and "http.response.pathsend" in extensions:
+            await send({"type": "http.response.pathsend", "path": path})
+            return
+
+        # Yedek yol: mmap. Parçalar sayfa önbelleğinden kopyalanır, read() syscall'ı yapılmaz.
+        # open ve her dilim (sayfa hatası → disk okuması olabilir) thread havuzunda: event loop beklemez.
+        mapped = await run_in_threadpool(map_file, path)
+        try:
+            for position in range(start, end, self.chunk_size):
+                chunk_end = min(position + self.chunk_size, end)
+                await send({
+                    "type": "http.response.body",
+                    "body": await run_in_threadpool(mapped.__getitem__, slice(position, chunk_end)),
+                    "more_body": chunk_end < end,
+                })
+        finally:
+            mapped.close()
+
+    async def send_empty(self, send, status_code: int, headers: list | None = None):
+        headers = list(headers or [])
+        if status_code != 304:  # 304 cevabında content-length gönderilmez
+            headers.append((b"content-length", b"0"))
+        await send({"type": "http.response.start", "status": status_code, "headers": headers})
+        await send({"type": "http.response.body", "body": b"", "more_body": False})
+
+
+def map_file(path: str) -> mmap.mmap:
+    """Dosyayı salt okunur eşler; dosya tanıtıcısı hemen kapatılır (eşleme açık kalır)."""
+    with open(path, "rb") as file:
+        mapped = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+    if hasattr(mmap, "MADV_SEQUENTIAL"):
+        mapped.madvise(mmap.MADV_SEQUENTIAL)  # Kernel'e ileriyi önceden okumasını söyle
+    return mapped
+
+
+# 4) SICAK DOSYA ÖNBELLEĞİ (hot files)
+# StaticFiles /static/logo.png'nin her isteğinde stat + open + read + close yapar.
+# Küçük ve sık istenen dosyalar için:
+# - URL yolu → StaticEntry (stat ve ETag sonucu) tutulur → realpath/stat her istekte yapılmaz
+# - max_file_size altındaki dosyaların içeriği ve hazır 200 header'ları RAM'de tutulur
+# - Toplam içerik max_bytes'ı geçince en uzun süredir istenmeyen dosya atılır (LRU)
+# - revalidate_interval saniyede bir os.stat ile dosyanın değişip değişmediğine bakılır;
+#   değiştiyse kayıt atılır ve dosya diskten yeniden yüklenir
+# Sadece event loop thread'inden kullanılır → kilit gerekmez.
+
+class HotEntry:
+    __slots__ = ("route_path", "entry", "checked_at", "responses", "nbytes")
+
+    def __init__(self, route_path: str, entry: StaticEntry):
+        self.route_path = route_path
+        self.entry = entry
+        self.checked_at = time.monotonic()
+        # Gösterim ETag'i (orijinal / -br / -gzip ...) → (header'lar, içerik)
+        self.responses: dict[str, tuple[list, bytes]] = {}
+        self.nbytes = 0
+
+
+def read_small_file(path: str) -> bytes:
+    with open(path, "rb") as f:
+        return f.read()
+
+
+class HotFileCache:
+    """
+    max_bytes → RAM'de tutulacak toplam içerik (byte bütçesi)
+    max_file_size → bundan büyük dosyaların içeriği tutulmaz (sadece stat/ETag bilgisi)
+    revalidate_interval → dosya değişikliğinin en geç kaç saniyede fark edileceği
+    max_entries → içeriksiz kayıtlar dahil en fazla kaç URL tutulacağı
+    """
+
+    def __init__(
+        self,
+        max_bytes: int = 64 * 1024 * 1024,
+        *,
+        max_file_size: int = 64 * 1024,
+        revalidate_interval: float = 1.0,
+        max_entries: int = 10_000,
+    ):
+        self.max_bytes = max_bytes
+        self.max_file_size = max_file_size
+        self.revalidate_interval = revalidate_interval
+        self.max_entries = max_entries
+        self._entries: OrderedDict[str, HotEntry] = OrderedDict()
+        self.nbytes = 0
+
+        # İstatistikler
+        self.hits = 0
+        self.misses = 0
+        self.revalidations = 0
+        self.invalidations = 0
+        self.evictions = 0
+
+    def lookup(self, route_path: str) -> HotEntry | None:
+        hot = self._entries.get(route_path)
+        if hot is None:
+            self.misses += 1
+            return None
+        now = time.monotonic()
+        if now - hot.checked_at >= self.revalidate_interval:
+            self.revalidations += 1
+            try:
+                # Sadece stat: tek syscall, metadata zaten kernel önbelleğinde. Thread'e göndermeye değmez.
+                stat_result = os.stat(hot.entry.path)
+                version = (stat_result.st_ino, stat_result.st_mtime_ns, stat_result.st_size)
+            except OSError:
+                version = None
+            if version != hot.entry.version:
+                self.invalidations += 1
+                self._remove(route_path)
+                return None
+            hot.checked_at = now
+        self._entries.move_to_end(route_path)
+        self.hits += 1
+        return hot
+
+    def store(self, route_path: str, entry: StaticEntry) -> HotEntry:
+        self._remove(route_path)
+        hot = self._entries[route_path] = HotEntry(route_path, entry)
+        self._evict()
+        return hot
+
+    async def response(self, hot: HotEntry, entry: StaticEntry, static_files: FastStaticFiles):
+        """Hazır (header'lar, içerik) döner; dosya büyükse veya okunurken değiştiyse None."""
+        cached = hot.responses.get(entry.etag)
+        if cached is not None:
+            return cached
+        if entry.size > self.max_file_size or entry.size > self.max_bytes:
+            return None
+        body = await run_in_threadpool(read_small_file, entry.path)
+        if len(body) != entry.size:  # stat ile okuma arasında dosya değişti → önbelleğe alma
+            return None
+        cached = (static_files.response_headers(entry), body)
+        if self._entries.get(hot.route_path) is not hot:  # Okurken kayıt atıldı/yenilendi → sadece bu isteğe ver
+            return cached
+        hot.responses[entry.etag] = cached
+        hot.nbytes += len(body)
+        self.nbytes += len(body)
+        self._evict()
+        return cached
+
+    def _remove(self, route_path: str):
+        hot = self._entries.pop(route_path, None)
+        if hot is not None:
+            self.nbytes -= hot.nbytes
+
+    def _evict(self):
+        while self._entries and (self.nbytes > self.max_bytes or len(self._entries) > self.max_entries):
+            _, hot = self._entries.popitem(last=False)
+            self.nbytes -= hot.nbytes
+            self.evictions += 1
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self._entries),
+            "bytes": self.nbytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "revalidations": self.revalidations,
+            "invalidations": self.invalidations,
+            "evictions": self.evictions,
+        }
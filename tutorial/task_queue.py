@@ -0,0 +1,246 @@
+# TASK QUEUE — süreç içi, toplu (batch) çalışan arka plan görev kuyruğu
+# background_tasks.py bu dosyayı kullanır.
+#
+# Neden?
+# BackgroundTasks görevi isteğin ömrüne bağlar: cevap gönderilince aynı istek içinde tek tek çalıştırır.
+# - Sunucu çökerse / yeniden başlarsa bekleyen işler kaybolur
+# - Her görev ayrı çalışır → log yazarken her satır için open + write + close
+#
+# Burada görevler bir kuyruğa atılır, arka plandaki worker'lar onları toplu halde işler:
+# - asyncio.Queue(maxsize) → sınırlı kuyruk; dolarsa put() bekler (backpressure)
+# - N worker coroutine → her biri batch_size öğe veya flush_interval süresi dolana kadar toplar
+# - handler(batch) hata verirse üstel bekleme (backoff) ile tekrar denenir
+# - stop() → yeni iş kabul etmez, kuyruktaki her şey işlenene kadar bekler (graceful drain)
+# - journal_path verilirse her öğe işlenmeden önce diske (append-only) yazılır;
+#   çökme sonrası start() işlenmemiş öğeleri tekrar kuyruğa koyar
+#   put() diske yazmaz, kaydı bellekte biriktirir; ayrı bir flusher görevi flush_interval içinde
+#   biriken kayıtları thread havuzunda tek write ile yazar (group commit) → event loop'ta put başına syscall yok
+
+import asyncio
+import inspect
+import json
+import os
+import time
+
+
+class TaskQueue:
+    """
+    handler → list[item] alan fonksiyon. async ise event loop'ta, normal fonksiyonsa
+              thread havuzunda çalışır (dosya yazmak gibi bloklayan işler event loop'u durdurmasın).
+    Öğeler journal'a JSON olarak yazıldığı için JSON'a çevrilebilir olmalıdır.
+    """
+
+    def __init__(
+        self,
+        handler,
+        *,
+        workers: int = 2,
+        maxsize: int = 10_000,
+        batch_size: int = 100,
+        flush_interval: float = 0.05,
+        max_retries: int = 3,
+        retry_backoff: float = 0.1,
+        journal_path: str | None = None,
+    ):
+        self.handler = handler
+        self.workers = workers
+        self.maxsize = maxsize
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self.journal_path = journal_path
+
+        self._queue: asyncio.Queue | None = None
+        self._tasks: list[asyncio.Task] = []
+        self._journal = None
+        self._journal_buffer: list[str] = []  # Henüz yazılmamış journal satırları
+        self._journal_lock = asyncio.Lock()  # Yazmalar sırayla: "done" kaydı "put"tan önce diske inmesin
+        self._journal_pending = asyncio.Event()  # Tamponda yazılmamış kayıt var
+        self._journal_closing = False
+        self._journal_flusher: asyncio.Task | None = None
+        self._next_id = 0
+        self._accepting = False
+
+        # İstatistikler
+        self.enqueued = 0
+        self.processed = 0
+        self.batches = 0
+        self.retries = 0
+        self.failed = 0
+
+    # 1) BAŞLATMA / DURDURMA
+
+    async def start(self):
+        self._queue = asyncio.Queue(self.maxsize)
+        # Worker'lar önce başlar: journal'dan gelen iş maxsize'dan fazlaysa put() bekleyebilsin
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        if self.journal_path:
+            pending = self._replay_journal()
+            self._compact_journal(pending)
+            self._journal = open(self.journal_path, "a", encoding="utf-8")
+            self._journal_closing = False
+            self._journal_flusher = asyncio.create_task(self._run_journal_flusher())
+            for item_id, item in pending:  # Önceki çalışmadan kalan işler
+                await self._queue.put((item_id, item))
+                self.enqueued += 1
+        self._accepting = True
+
+    async def stop(self):
+        """Kuyruktaki her şey işlenir, sonra worker'lar kapatılır."""
+        self._accepting = False
+        await self._queue.join()
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        if self._journal is not None:
+            # Her şey işlendi → journal'ı sıfırla ki bir sonraki açılışta baştan okunmasın
+            self._journal_closing = True
+            self._journal_pending.set()
+            await self._journal_flusher  # Son kayıtları yazıp çıkar
+            self._journal_flusher = None
+            self._journal.close()
+            self._journal = None
+            open(self.journal_path, "w").close()
+
+    # 2) KUYRUĞA EKLEME
+
+    async def put(self, item):
+        """Kuyruk doluysa yer açılana kadar bekler."""
+        if not self._accepting:
+            raise RuntimeError("TaskQueue kapalı, yeni görev kabul edilmiyor")
+        item_id = self._next_id
+        self._next_id += 1
+        if self._journal is not None:
+            # Kuyruğa girmeden önce journal'a (tamponda); flusher en geç flush_interval sonra diske yazar
+            self._append_journal({"op": "put", "id": item_id, "item": item})
+        await self._queue.put((item_id, item))
+        self.enqueued += 1
+
+    def qsize(self) -> int:
+        return self._queue.qsize() if self._queue is not None else 0
+
+    def stats(self) -> dict:
+        return {
+            "queued": self.qsize(),
+            "enqueued": self.enqueued,
+            "processed": self.processed,
+            "batches": self.batches,
+            "retries": self.retries,
+            "failed": self.failed,
+        }
+
+    # 3) WORKER
+
+    async def _next_batch(self) -> list:
+        """İlk öğeyi bekler, sonra batch_size'a veya flush_interval süresine kadar toplamaya devam eder."""
+        batch = [await self._queue.get()]
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self._queue.get_nowait())
+                continue
+            except asyncio.QueueEmpty:
+                pass
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run_handler(self, items: list):
+        if inspect.iscoroutinefunction(self.handler):
+            await self.handler(items)
+        else:
+            await asyncio.to_thread(self.handler, items)
+
+    async def _worker(self):
+        while True:
+            batch = await self._next_batch()
+            items = [item for _, item in batch]
+            op = "done"
+            for attempt in range(self.max_retries + 1):
+                try:
+                    await self._run_handler(items)
+                    self.processed += len(items)
+                    break
+                except Exception:
+                    if attempt == self.max_retries:
+                        # Denemeler tükendi: journal'a "failed" yazılır, tekrar oynatılmaz
+                        self.failed += len(items)
+                        op = "failed"
+                        break
+                    self.retries += 1
+                    await asyncio.sleep(self.retry_backoff * 2**attempt)
+            self.batches += 1
+            if self._journal is not None:
+                self._append_journal({"op": op, "ids": [item_id for item_id, _ in batch]})
+            for _ in batch:
+                self._queue.task_done()
+
+    # 4) JOURNAL
+    # Her satır bir JSON kaydı: {"op": "put", "id", "item"} veya {"op": "done"/"failed", "ids"}
+    # Dosya tek sefer açılır; biriken kayıtlar write + flush ile işletim sistemine ulaşır.
+    # Sadece süreç çökmesine karşı korur; elektrik kesintisi için fsync gerekir (bilerek yok, pahalı).
+    # Kayıtlar worker'lardan bağımsız bir flusher görevi tarafından yazılır: handler yavaşken veya
+    # retry backoff'ta beklerken de kabul edilen öğeler diske iner.
+    # Bedel: put() döndükten sonra en fazla flush_interval + bir write süresi boyunca kayıt sadece
+    # bellektedir; bu pencerede çökme olursa o öğeler kaybolur. Her put'ta diske yazmak pencereyi
+    # kapatır ama event loop'ta put başına bir write + flush syscall'ı demektir.
+
+    def _append_journal(self, record: dict):
+        self._journal_buffer.append(json.dumps(record) + "\n")
+        self._journal_pending.set()
+
+    async def _run_journal_flusher(self):
+        while True:
+            await self._journal_pending.wait()
+            if not self._journal_closing:
+                await asyncio.sleep(self.flush_interval)  # Bu sürede gelen kayıtlar aynı write'a girer
+            self._journal_pending.clear()
+            await self._flush_journal()
+            if self._journal_closing:
+                return
+
+    async def _flush_journal(self):
+        async with self._journal_lock:
+            lines, self._journal_buffer = self._journal_buffer, []
+            if lines:
+                await asyncio.to_thread(self._write_journal_lines, lines)
+
+    def _write_journal_lines(self, lines: list[str]):
+        self._journal.writelines(lines)
+        self._journal.flush()
+
+    def _replay_journal(self) -> list[tuple[int, object]]:
+        if not os.path.exists(self.journal_path):
+            return []
+        pending: dict[int, object] = {}
+        with open(self.journal_path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    break  # Çökme anında yarım kalmış son satır
+                if record["op"] == "put":
+                    pending[record["id"]] = record["item"]
+                    self._next_id = max(self._next_id, record["id"] + 1)
+                else:
+                    for item_id in record["ids"]:
+                        pending.pop(item_id, None)
+        return sorted(pending.items())
+
+    def _compact_journal(self, pending: list[tuple[int, object]]):
+        """
+        Journal'ı sadece bekleyen öğelerle yeniden yazar.
+        Hem dosya sonsuz büyümez hem de yarım kalmış son satırın arkasına yeni kayıt eklenmez.
+        """
+        tmp_path = self.journal_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            for item_id, item in pending:
+                f.write(json.dumps({"op": "put", "id": item_id, "item": item}) + "\n")
+        os.replace(tmp_path, self.journal_path)  # Atomik: ya eski dosya ya yenisi